@@ -1,17 +1,21 @@
 from machine import unique_id, freq
 from os import uname
 from gc import mem_free, mem_alloc
+from ubinascii import hexlify
 
 class DeviceInfo:
+    # Fields that never change while the board is running, computed once at import
+    _STATIC = {
+        "Platform": uname()[0],
+        "Board": "ESP32-D0WDQ6",
+        "Version": uname()[2],
+        "Board ID": hexlify(unique_id(), ":").decode(),
+        "CPU frequency": f"{freq() / 1_000_000:.2f} MHz",
+    }
+
     @staticmethod
     def get_system_info():
-        board_id = ":".join("{:02x}".format(b) for b in unique_id())
-        return {
-            "Platform": uname()[0],
-            "Board": "ESP32-D0WDQ6",
-            "Version": uname()[2],
-            "Board ID": board_id,
-            "CPU frequency": f"{freq() / 1_000_000:.2f} MHz",
-            "Allocated memory": f"{mem_alloc() / 1024:.2f} KB",
-            "Free memory": f"{mem_free() / 1024:.2f} KB"
-        }
+        info = DeviceInfo._STATIC.copy()  # Only the memory counters are read on every call
+        info["Allocated memory"] = f"{mem_alloc() / 1024:.2f} KB"
+        info["Free memory"] = f"{mem_free() / 1024:.2f} KB"
+        return info
@@ -1,10 +1,22 @@
 from machine import Pin
 import uasyncio as asyncio
+import time
+from array import array
+from micropython import const, schedule
+
+# Minimum interval between two accepted falling edges of the same button (contact bounce filter)
+DEBOUNCE_MS = const(30)
+# Minimum interval between two dispatched presses of the same button (repeat lockout)
+PRESS_LOCKOUT_MS = const(300)
 
 class Buttons:
     """
     This class manages the buttons used for controlling elevators and panels.
     It detects button presses and triggers appropriate actions via the WebSocket client (if configured).
+
+    Presses are detected by hard GPIO interrupts: each ISR only filters bounce and schedules
+    `_on_press()`, which marks the button in a pending map and wakes the `run()` task, so the task
+    sleeps while no button is touched instead of polling the pins.
     """
     def __init__(self, call_pins, panel_pins, prg_pin):
         """
@@ -24,73 +36,134 @@ class Buttons:
         self.ws_client = None  # Placeholder for the WebSocket client instance
         self.current_motor = 0  # Placeholder for the current motor identifier
 
-    def set_ws_client(self, ws_client):
+        # All buttons share one pending map laid out as [call..., panel..., prg]
+        buttons = self.call_buttons + self.panel_buttons + [self.prg_button]
+        self._panel_offset = len(self.call_buttons)  # Index of the first panel button in the map
+        self._prg_index = len(buttons) - 1  # Index of the PRG button in the map
+        self._pending = bytearray(len(buttons))  # 1 = press reported by the ISR, not yet dispatched
+        self._last_irq = array('i', [0] * len(buttons))  # ticks_ms() of the last accepted edge per button
+        self._last_press = array('i', [0] * len(buttons))  # ticks_ms() of the last dispatched press per button
+        self._flag = asyncio.ThreadSafeFlag()  # Set by _on_press() to wake up run()
+
+        # Attach a falling-edge interrupt to every button (active-low)
+        for i, button in enumerate(buttons):
+            button.irq(trigger=Pin.IRQ_FALLING, handler=self._make_isr(i), hard=True)
+
+    def _on_press(self, index):
         """
-        Link the WebSocket client to the buttons controller.
+        Scheduled callback of the button ISRs, runs outside interrupt context.
 
         Args:
-            ws_client (WebSocketClient): The WebSocket client instance to send actions to.
+            index (int): Position of the button in the pending map.
         """
-        self.ws_client = ws_client  # Store the WebSocket client reference
+        self._pending[index] = 1  # Mark the button as pressed
+        self._flag.set()  # Wake up the dispatch task
 
-    async def is_panel_active_for(self, elevator_id):
+    def _make_isr(self, index):
         """
-        Check if the panel is active for the specified elevator.
+        Build the interrupt handler for one button.
+
+        The handler runs in hard interrupt context, so it must not allocate: it only filters
+        contact bounce and schedules `_on_press()`; all the real work is done later by `run()`.
 
         Args:
-            elevator_id (int): The ID of the elevator to check.
+            index (int): Position of the button in the pending map.
 
         Returns:
-            bool: True if the panel is active for the elevator, False otherwise.
+            function: Handler to pass to `Pin.irq()`.
+        """
+        pending = self._pending
+        last_irq = self._last_irq
+        on_press = self._on_press  # Bound once here, creating it inside the ISR would allocate
+        flag_set = self._flag.set  # ThreadSafeFlag.set is safe to call from a hard IRQ
+
+        def isr(pin):
+            now = time.ticks_ms()
+            if time.ticks_diff(now, last_irq[index]) < DEBOUNCE_MS:
+                return  # Contact bounce, ignore the edge
+            last_irq[index] = now
+            try:
+                schedule(on_press, index)  # Finish the press outside interrupt context
+            except Exception:
+                # Schedule queue full: record the press and wake run() directly
+                pending[index] = 1
+                flag_set()
+
+        return isr
+
+    def set_ws_client(self, ws_client):
         """
-        return (
-            self.ws_client and  # Ensure the WebSocket client is configured
-            elevator_id in self.ws_client.active_elevators and  # Check if the elevator is active
-            not self.ws_client.active_elevators[elevator_id].done()  # Ensure the task is not completed
-        )
+        Link the WebSocket client to the buttons controller.
+
+        Args:
+            ws_client (WebSocketClient): The WebSocket client instance to send actions to.
+        """
+        self.ws_client = ws_client  # Store the WebSocket client reference
 
     async def run(self):
         """
-        Main asynchronous task to monitor button presses and trigger actions.
+        Main asynchronous task to dispatch button presses reported by the interrupts.
 
-        This method continuously checks the state of call buttons, panel buttons, 
-        and the PRG button. It sends corresponding commands to the WebSocket server.
+        This method sleeps until an ISR sets the flag, then handles every pending call button,
+        panel button and PRG button press. It sends corresponding commands to the WebSocket server.
+        Repeated presses are limited per button, so one busy button never delays the others.
         """
+        # Bind everything the dispatch loop touches to locals once
+        pending = self._pending
+        flag_wait = self._flag.wait
+        call_count = len(self.call_buttons)
+        panel_count = len(self.panel_buttons)
+        panel_offset = self._panel_offset
+        prg_index = self._prg_index
+        last_press = self._last_press
+        ticks_ms = time.ticks_ms
+        ticks_diff = time.ticks_diff
+
+        def accept(index):
+            # Consume the pending press and apply the per-button repeat lockout
+            pending[index] = 0  # Mark the press as handled
+            now = ticks_ms()
+            if ticks_diff(now, last_press[index]) < PRESS_LOCKOUT_MS:
+                return False  # Pressed again too soon, drop it
+            last_press[index] = now
+            return True
+
         while True:
-            # Check for call button presses
-            for i, button in enumerate(self.call_buttons):
-                if button.value() == 0:  # Button is pressed (active-low)
+            # Sleep until at least one button interrupt fires
+            await flag_wait()
+            ws = self.ws_client  # May be linked after the task is started
+
+            # Dispatch call button presses
+            for i in range(call_count):
+                if pending[i] and accept(i):
                     print(f"Call button {i+1} pressed (floor {i+1})")
                     # Send a call request to the WebSocket server if configured
-                    if self.ws_client:
-                        await self.ws_client.send_call(floor=i+1, elevator=i)
-                    await asyncio.sleep_ms(300)  # Debounce delay for button press
+                    if ws:
+                        await ws.send_call(floor=i+1, elevator=i)
 
-            # Check for panel button presses associated with active elevators
-            if self.ws_client:
-                # Get a list of active elevator IDs
-                active_elevators = list(getattr(self.ws_client, 'active_elevators', {}).keys())
+            # Dispatch panel button presses to the active elevators
+            for i in range(panel_count):
+                if not pending[panel_offset + i] or not accept(panel_offset + i):
+                    continue
+                if not ws:
+                    continue  # Nobody to send the task to, drop the press
 
-                for elevator_id in active_elevators:
+                # One activity byte per elevator ID
+                active_elevators = ws.active_elevators
+
+                for elevator_id in range(len(active_elevators)):
                     # Check if the panel is active for the current elevator
-                    if await self.is_panel_active_for(elevator_id):
-                        for i, panel_button in enumerate(self.panel_buttons):
-                            if panel_button.value() == 0:  # Button is pressed (active-low)
-                                print(f"Panel button {i+1} pressed for elevator {elevator_id}")
-                                # Send a task request to the WebSocket server
-                                await self.ws_client.send_task(
-                                    floor=i+1,  # Floor number
-                                    motor=elevator_id  # Elevator ID
-                                )
-                                await asyncio.sleep_ms(300)  # Debounce delay for button press
-
-            # Check for PRG button press (used for resetting elevators)
-            if self.prg_button.value() == 0:  # Button is pressed (active-low)
+                    if active_elevators[elevator_id]:
+                        print(f"Panel button {i+1} pressed for elevator {elevator_id}")
+                        # Send a task request to the WebSocket server
+                        await ws.send_task(
+                            floor=i+1,  # Floor number
+                            motor=elevator_id  # Elevator ID
+                        )
+
+            # Dispatch PRG button press (used for resetting elevators)
+            if pending[prg_index] and accept(prg_index):
                 print("PRG button pressed - resetting all elevators")
                 # Send a reset command to the WebSocket server if configured
-                if self.ws_client:
-                    await self.ws_client.send_reset()
-                await asyncio.sleep_ms(300)  # Debounce delay for button press
-
-            # Short delay for the loop to avoid excess CPU usage
-            await asyncio.sleep_ms(50)
\ No newline at end of file
+                if ws:
+                    await ws.send_reset()
\ No newline at end of file
@@ -1,11 +1,29 @@
 from machine import Pin, PWM
 import uasyncio as asyncio
+from array import array
+from micropython import const
+
+# Time between two duty steps of a tone ramp (the ESP32 PWM has no hardware fade)
+RAMP_STEP_MS = const(5)
+
+# Seven Nation Army intro as parallel note arrays: frequency in Hz (0 = pause) and duration in ms.
+# Notes: E4 = 329, G4 = 392, D4 = 293, C4 = 261, B3 = 246 (the integer part PWM plays)
+_MELODY_FREQ = array('H', [329, 0, 329, 0, 392, 0, 329, 0, 293, 0, 261, 0, 246, 0])
+_MELODY_DUR = array('H', [200, 400, 100, 100, 100, 200, 100, 200, 100, 100, 200, 400, 400, 400])
 
 class Buzzer:
     """
     This class manages a PWM-based buzzer to produce sounds, tones, and melodies.
     It provides methods for playing individual tones, predefined melodies, and sound signals (e.g., elevator arrival).
     """
+    # Predefined signal patterns as tuples of (frequency, duration) pairs, shared by every instance
+    SIGNALS = {
+        "arrival": ((784, 150), (0, 50), (1047, 300)),
+        "departure": ((659, 100), (0, 50), (784, 150), (0, 50), (659, 300)),
+        "button": ((523, 80),),
+        "error": ((392, 100), (0, 100), (392, 100), (0, 100), (392, 100))
+    }
+
     def __init__(self, pin):
         """
         Initialize the Buzzer instance.
@@ -17,6 +35,7 @@ class Buzzer:
         self.pwm = None  # PWM object for controlling the buzzer
         self.volume = 512  # Default volume level (50% of the maximum duty cycle)
         self.active = False  # Flag to indicate if the buzzer is currently active
+        self._ramp_cache = {}  # Duty ramp tables keyed by (volume, ramp_ms)
         self._init_pwm()  # Initialize the PWM for the buzzer
 
     def _init_pwm(self):
@@ -49,41 +68,50 @@ class Buzzer:
             frequency (float): Frequency of the tone in Hz. Use 0 for silence.
             duration_ms (int): Duration of the tone in milliseconds.
         """
+        pwm = self.pwm
+        sleep_ms = asyncio.sleep_ms
         if frequency == 0:  # Play silence
-            self.pwm.duty(0)  # Turn off the buzzer
-            await asyncio.sleep_ms(duration_ms)  # Wait for the specified duration
+            pwm.duty(0)  # Turn off the buzzer
+            await sleep_ms(duration_ms)  # Wait for the specified duration
         else:
-            self.pwm.freq(int(frequency))  # Set the frequency
-            self.pwm.duty(512)  # Set duty cycle to 50% to produce sound
-            await asyncio.sleep_ms(duration_ms)  # Wait for the duration of the tone
-            self.pwm.duty(0)  # Turn off the buzzer
-            await asyncio.sleep_ms(50)  # Short delay before ending the tone
+            pwm.freq(int(frequency))  # Set the frequency
+            pwm.duty(512)  # Set duty cycle to 50% to produce sound
+            await sleep_ms(duration_ms)  # Wait for the duration of the tone
+            pwm.duty(0)  # Turn off the buzzer
+            await sleep_ms(50)  # Short delay before ending the tone
 
     async def melody(self):
         """
         Play a predefined melody (Seven Nation Army intro).
-        This melody is composed of multiple notes with specific frequencies and durations.
+        The notes are stored in the module-level _MELODY_FREQ and _MELODY_DUR arrays.
         """
-        # Define frequencies for musical notes
-        E4 = 329.63
-        G4 = 392.00
-        D4 = 293.66
-        C4 = 261.63
-        B3 = 246.94
-
-        # Define the melody as a sequence of (frequency, duration) tuples
-        melody_notes = [
-            (E4, 200), (0, 400), (E4, 100), (0, 100), (G4, 100), (0, 200), (E4, 100),
-            (0, 200), (D4, 100), (0, 100), (C4, 200), (0, 400), (B3, 400), (0, 400)
-        ]
-
         # Play each note in the melody
-        for note in melody_notes:
-            frequency, duration = note
-            await self.play_tone(frequency, duration)
+        play_tone = self.play_tone
+        for i in range(len(_MELODY_FREQ)):
+            await play_tone(_MELODY_FREQ[i], _MELODY_DUR[i])
 
         self.pwm.duty(0)  # Ensure the buzzer is turned off after the melody
 
+    def _ramp_table(self, ramp_ms):
+        """
+        Get the integer duty cycle table for a ramp at the current volume.
+        Entry `i` holds the duty for ramp step `i`, so the ramp loops only index the table.
+
+        Args:
+            ramp_ms (int): Duration of the ramp in milliseconds (one step per RAMP_STEP_MS).
+
+        Returns:
+            array: Duty cycle values for steps 0..ramp_ms // RAMP_STEP_MS.
+        """
+        key = (self.volume, ramp_ms)
+        table = self._ramp_cache.get(key)
+        if table is None:
+            steps = max(1, ramp_ms // RAMP_STEP_MS)  # Number of ramp steps
+            volume = self.volume
+            table = array('H', (volume * i // steps for i in range(steps + 1)))
+            self._ramp_cache[key] = table  # Build once, reuse for every following tone
+        return table
+
     async def _play_advanced(self, freq, duration_ms, ramp_ms=30):
         """
         Play a tone with a ramp-up and ramp-down effect for smoother transitions.
@@ -102,20 +130,24 @@ class Buzzer:
 
         self.pwm.freq(int(freq))  # Set the frequency of the tone
 
+        table = self._ramp_table(ramp_ms)  # Precomputed duty values for the ramps
+        steps = len(table) - 1  # Number of ramp steps
+        duty = self.pwm.duty
+        sleep_ms = asyncio.sleep_ms
+
         # Ramp-up phase
-        steps = max(1, ramp_ms)  # Number of ramp steps
         for i in range(steps):
-            self.pwm.duty(int(self.volume * (i / steps)))  # Gradually increase volume
-            await asyncio.sleep_ms(1)  # Short delay between steps
+            duty(table[i])  # Gradually increase volume
+            await sleep_ms(RAMP_STEP_MS)  # Short delay between steps
 
         # Sustain phase
         sustain_ms = max(0, duration_ms - 2 * ramp_ms)  # Duration of the constant tone
-        await asyncio.sleep_ms(sustain_ms)
+        await sleep_ms(sustain_ms)
 
         # Ramp-down phase
         for i in range(steps, 0, -1):
-            self.pwm.duty(int(self.volume * (i / steps)))  # Gradually decrease volume
-            await asyncio.sleep_ms(1)
+            duty(table[i])  # Gradually decrease volume
+            await sleep_ms(RAMP_STEP_MS)
 
         await self._ensure_cleanup()  # Clean up after playing the tone
 
@@ -130,20 +162,13 @@ class Buzzer:
                 - "button": Button press confirmation signal.
                 - "error": Error signal.
         """
-        # Define signal patterns as sequences of (frequency, duration) tuples
-        signals = {
-            "arrival": [(784, 150), (0, 50), (1047, 300)],
-            "departure": [(659, 100), (0, 50), (784, 150), (0, 50), (659, 300)],
-            "button": [(523, 80)],
-            "error": [(392, 100), (0, 100), (392, 100), (0, 100), (392, 100)]
-        }
-
         await self._ensure_cleanup()  # Ensure the buzzer is clean before starting
         self.active = True  # Mark the buzzer as active
 
         # Play the sequence of tones for the selected signal type
-        for freq, duration in signals.get(signal_type, []):
-            await self._play_advanced(freq, duration)
+        play = self._play_advanced
+        for freq, duration in self.SIGNALS.get(signal_type, ()):
+            await play(freq, duration)
 
         await self._ensure_cleanup()  # Clean up after playing the signal
 
@@ -156,6 +181,7 @@ class Buzzer:
         """
         # Convert volume from percentage (0-100) to the PWM duty cycle range (0-1023)
         self.volume = int(min(max(volume, 0), 100) * 10.23)
+        self._ramp_cache.clear()  # Ramp tables were built for the previous volume
         if self.active and self.pwm is not None:
             self.pwm.duty(self.volume)  # Update the duty cycle if the buzzer is active
 
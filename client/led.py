@@ -1,5 +1,12 @@
-from machine import Pin
+from machine import Pin, mem32
 import uasyncio as asyncio
+import time
+from array import array
+from micropython import const
+
+# ESP32 GPIO output set/clear registers, writing a mask changes only the pins whose bits are set
+_GPIO_OUT_W1TS = const(0x3FF44008)
+_GPIO_OUT_W1TC = const(0x3FF4400C)
 
 class LEDController:
     """
@@ -16,6 +23,75 @@ class LEDController:
         self.led = Pin(pin, Pin.OUT)  # Initialize the pin as an output pin for controlling the LED
         self.mode = "idle"  # Default mode is "idle", where the LED remains off
         self.led.value(0)  # Turn off the LED initially
+        if pin < 32:
+            self._mask = 1 << pin  # Bit of the pin in the GPIO output registers
+            self._set = self._write  # Drive the pin with a single register store
+        else:
+            self._set = self.led.value  # Pins 32+ live in the second register bank, use the Pin API
+        self._led_state = 0  # Last value written to the pin, so toggling never reads it back
+
+        # Mode -> coroutine playing one cycle of the mode's pattern ("idle" has no pattern)
+        self._handlers = {
+            "wifi_connect": self._blink_fast,
+            "pairing": self._blink_triple,
+            "connecting": self._blink_slow,
+            "connected": self._solid_on,
+            "not_connected": self._blink_fast,
+        }
+        self._wake = asyncio.Event()  # Set while the mode has a pattern, run() blocks on it otherwise
+
+    def _write(self, value):
+        """
+        Set the LED pin through the W1TS/W1TC registers, bypassing the Pin object.
+
+        Args:
+            value (int): 1 to turn the LED on, 0 to turn it off.
+        """
+        mem32[_GPIO_OUT_W1TS if value else _GPIO_OUT_W1TC] = self._mask
+
+    def _toggle(self):
+        """
+        Invert the LED state using the cached state instead of reading the pin back.
+        """
+        self._led_state ^= 1  # Flip the stored state
+        self._set(self._led_state)  # Write it to the pin
+
+    async def _blink_fast(self):
+        """
+        Blink the LED rapidly (100ms interval) to indicate Wi-Fi connection attempts,
+        a disconnection or an error state.
+        """
+        self._toggle()  # Toggle the LED state
+        await asyncio.sleep_ms(100)  # Wait for 100 milliseconds
+
+    async def _blink_triple(self):
+        """
+        Blink the LED three times quickly, then pause for 1 second to indicate pairing mode.
+        """
+        set_pin = self._set
+        sleep_ms = asyncio.sleep_ms
+        for _ in range(3):
+            set_pin(1)  # Turn on the LED
+            await sleep_ms(100)  # Wait for 100 milliseconds
+            set_pin(0)  # Turn off the LED
+            await sleep_ms(100)  # Wait for 100 milliseconds
+        self._led_state = 0  # The pattern always ends with the LED off
+        await sleep_ms(1000)  # Pause for 1 second
+
+    async def _blink_slow(self):
+        """
+        Blink the LED with a 500ms interval to indicate a connection attempt.
+        """
+        self._toggle()  # Toggle the LED state
+        await asyncio.sleep_ms(500)  # Wait for 500 milliseconds
+
+    async def _solid_on(self):
+        """
+        Keep the LED on continuously to indicate a successful connection.
+        """
+        self._led_state = 1
+        self._set(1)  # Turn on the LED
+        await asyncio.sleep_ms(100)  # Short delay to avoid task overload
 
     async def run(self):
         """
@@ -23,33 +99,15 @@ class LEDController:
         This method runs indefinitely and adjusts the LED state dynamically.
         """
         print("LED task started")  # Log the start of the LED task
+        handlers = self._handlers
+        wake_wait = self._wake.wait
         while True:
-            # LED behavior for different modes
-            if self.mode == "wifi_connect":
-                # Blink the LED rapidly (100ms interval) to indicate Wi-Fi connection attempts
-                self.led.value(not self.led.value())  # Toggle the LED state
-                await asyncio.sleep_ms(100)  # Wait for 100 milliseconds
-            elif self.mode == "pairing":
-                # Blink the LED three times quickly, then pause for 1 second to indicate pairing mode
-                for _ in range(3):
-                    self.led.value(1)  # Turn on the LED
-                    await asyncio.sleep_ms(100)  # Wait for 100 milliseconds
-                    self.led.value(0)  # Turn off the LED
-                    await asyncio.sleep_ms(100)  # Wait for 100 milliseconds
-                await asyncio.sleep_ms(1000)  # Pause for 1 second
-            elif self.mode == "connecting":
-                # Blink the LED with a 500ms interval to indicate a connection attempt
-                self.led.value(not self.led.value())  # Toggle the LED state
-                await asyncio.sleep_ms(500)  # Wait for 500 milliseconds
-            elif self.mode == "connected":
-                # Keep the LED on continuously to indicate a successful connection
-                self.led.value(1)  # Turn on the LED
-                await asyncio.sleep_ms(100)  # Short delay to avoid task overload
-            elif self.mode == "not_connected":
-                # Blink the LED rapidly (100ms interval) to indicate a disconnection or error state
-                self.led.value(not self.led.value())  # Toggle the LED state
-                await asyncio.sleep_ms(100)  # Wait for 100 milliseconds
-            await asyncio.sleep(0)  # Yield control to other tasks in the event loop
+            # One dict lookup selects the pattern of the current mode
+            handler = handlers.get(self.mode)
+            if handler is not None:
+                await handler()  # Play one cycle of the pattern
+            else:
+                await wake_wait()  # No pattern (idle), sleep until set_mode() picks one
 
     def set_mode(self, mode):
         """
@@ -66,11 +124,20 @@ class LEDController:
         """
         print(f"LED mode: {mode}")  # Log the mode change
         self.mode = mode  # Update the mode
+        if mode in self._handlers:
+            self._wake.set()  # Resume the pattern loop
+        else:
+            self._wake.clear()  # Let run() block instead of spinning
+            self._led_state = 0
+            self._set(0)  # Idle keeps the LED off
 
 class ExtendedLEDs:
     """
     This class manages multiple LEDs for specific functionalities, such as call LEDs and panel LEDs.
     It provides methods to control individual LEDs or reset all LEDs to an off state.
+
+    All blinking is driven by the single `run()` task from a small state table, so starting a blink
+    only writes a few numbers instead of spawning a coroutine per blink.
     """
     def __init__(self, call_pins, panel_pins):
         """
@@ -84,9 +151,38 @@ class ExtendedLEDs:
         self.call_leds = [Pin(pin, Pin.OUT, value=0) for pin in call_pins]
         # Initialize panel LEDs as output pins and set their initial state to off
         self.panel_leds = [Pin(pin, Pin.OUT, value=0) for pin in panel_pins]
-        self.blink_task = None  # Placeholder for running blink tasks
 
-    async def blink_call_led(self, floor, times=3, interval_ms=500):
+        # Blink state table laid out as [call..., panel...]
+        leds = self.call_leds + self.panel_leds
+        self._set = [led.value for led in leds]  # Cached bound methods used to drive the pins
+        self._remaining = bytearray(len(leds))  # Toggles left per LED, 0 = not blinking
+        self._interval = array('H', [0] * len(leds))  # Blink interval per LED in milliseconds
+        self._deadline = array('i', [0] * len(leds))  # ticks_ms() of the next toggle per LED
+        self._wake = asyncio.Event()  # Set when a blink is started, so run() leaves its idle wait
+
+    def _blink(self, offset, count, floor, times, interval_ms):
+        """
+        Shared implementation of the blink methods: turn an LED on and hand the rest
+        of the blink over to `run()`.
+
+        Args:
+            offset (int): Position of the LED group (call or panel) in the state table.
+            count (int): Number of LEDs in the group.
+            floor (int): The floor number (1-based index) of the LED within the group.
+            times (int): The number of times the LED should blink, at most 127.
+            interval_ms (int): The duration (in milliseconds) for each blink.
+        """
+        if not 1 <= floor <= count or times <= 0:  # Invalid floor, or nothing to blink
+            return
+        times = min(times, 127)  # The toggle count is kept in a bytearray, 127 blinks fill it
+        index = offset + floor - 1  # Position of the LED in the state table
+        self._set[index](1)  # The first "on" phase starts right away
+        self._remaining[index] = times * 2 - 1  # Toggles still to be done by run()
+        self._interval[index] = interval_ms
+        self._deadline[index] = time.ticks_add(time.ticks_ms(), interval_ms)
+        self._wake.set()  # Wake up the driver task
+
+    def blink_call_led(self, floor, times=3, interval_ms=500):
         """
         Blink a specific call LED associated with a floor.
 
@@ -95,15 +191,9 @@ class ExtendedLEDs:
             times (int): The number of times the LED should blink (default: 3).
             interval_ms (int): The duration (in milliseconds) for each blink (default: 500ms).
         """
-        if 1 <= floor <= len(self.call_leds):  # Ensure the floor number is valid
-            led_index = floor - 1  # Calculate the LED index (0-based)
-            for _ in range(times):  # Blink the LED the specified number of times
-                self.call_leds[led_index].on()  # Turn on the LED
-                await asyncio.sleep_ms(interval_ms)  # Wait for the specified interval
-                self.call_leds[led_index].off()  # Turn off the LED
-                await asyncio.sleep_ms(interval_ms)  # Wait for the specified interval
+        self._blink(0, len(self.call_leds), floor, times, interval_ms)
 
-    async def blink_panel_led(self, floor, times=3, interval_ms=500):
+    def blink_panel_led(self, floor, times=3, interval_ms=500):
         """
         Blink a specific panel LED associated with a floor.
 
@@ -112,17 +202,53 @@ class ExtendedLEDs:
             times (int): The number of times the LED should blink (default: 3).
             interval_ms (int): The duration (in milliseconds) for each blink (default: 500ms).
         """
-        if 1 <= floor <= len(self.panel_leds):  # Ensure the floor number is valid
-            led_index = floor - 1  # Calculate the LED index (0-based)
-            for _ in range(times):  # Blink the LED the specified number of times
-                self.panel_leds[led_index].on()  # Turn on the LED
-                await asyncio.sleep_ms(interval_ms)  # Wait for the specified interval
-                self.panel_leds[led_index].off()  # Turn off the LED
-                await asyncio.sleep_ms(interval_ms)  # Wait for the specified interval
+        self._blink(len(self.call_leds), len(self.panel_leds), floor, times, interval_ms)
+
+    async def run(self):
+        """
+        Main asynchronous task that drives every blinking LED.
+        It toggles the LEDs whose deadline has passed, then sleeps until the next deadline,
+        or until a new blink is started when no LED is blinking.
+        """
+        set_pin = self._set
+        remaining = self._remaining
+        interval = self._interval
+        deadline = self._deadline
+        wake = self._wake
+        sleep_ms = asyncio.sleep_ms
+        ticks_ms = time.ticks_ms
+        ticks_add = time.ticks_add
+        ticks_diff = time.ticks_diff
+        count = len(remaining)
+
+        while True:
+            now = ticks_ms()
+            next_delay = -1  # Milliseconds until the nearest toggle, -1 = nothing is blinking
+            for i in range(count):
+                if not remaining[i]:
+                    continue
+                delay = ticks_diff(deadline[i], now)
+                if delay <= 0:
+                    remaining[i] -= 1
+                    set_pin[i](remaining[i] & 1)  # Odd = "on" phase, even = "off" phase
+                    if not remaining[i]:
+                        continue  # Blink finished, the LED is off
+                    deadline[i] = ticks_add(deadline[i], interval[i])
+                    delay = ticks_diff(deadline[i], now)
+                if next_delay < 0 or delay < next_delay:
+                    next_delay = delay
+
+            if next_delay < 0:
+                wake.clear()
+                await wake.wait()  # Nothing to do until the next blink is started
+            else:
+                await sleep_ms(next_delay)
 
     def reset_all(self):
         """
         Turn off all LEDs (both call and panel LEDs) to reset their states.
         """
+        for i in range(len(self._remaining)):
+            self._remaining[i] = 0  # Stop any running blink
         for led in self.call_leds + self.panel_leds:  # Iterate through all LEDs
-            led.off()  # Turn off each LED
\ No newline at end of file
+            led.off()  # Turn off each LED
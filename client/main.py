@@ -1,4 +1,5 @@
 import uasyncio as asyncio
+from micropython import const
 from wifi import WiFiClient
 from pairing import Pairing
 from websocket import WebSocketClient
@@ -19,37 +20,37 @@ GUEST_SSID = "SSID"         # Guest WiFi SSID
 GUEST_PASSWORD = "p@$$w0rd" # Guest WiFi password
 
 # GPIO pin for the primary LED indicator
-LED_PIN = 2
+_LED_PIN = const(2)
 
 # GPIO pins for the call LEDs (indicating call statuses)
-CALL_LED_PINS = [16, 17, 4]
+CALL_LED_PINS = (16, 17, 4)
 
 # GPIO pins for the panel LEDs (indicating panel statuses)
-PANEL_LED_PINS = [5, 18, 23]
+PANEL_LED_PINS = (5, 18, 23)
 
 # GPIO pins for the call buttons (used for user actions on call devices)
-CALL_BUTTON_PINS = [21, 13, 12]
+CALL_BUTTON_PINS = (21, 13, 12)
 
 # GPIO pins for the panel buttons (used for user actions on panel devices)
-PANEL_BUTTON_PINS = [14, 27, 25]
+PANEL_BUTTON_PINS = (14, 27, 25)
 
 # GPIO pin for the programming button
-PRG_PIN = 0
+_PRG_PIN = const(0)
 
 # GPIO pin for the buzzer (used for audio feedback)
-BUZZER_PIN = 19
+_BUZZER_PIN = const(19)
 
 # Initialize the LED controller for managing the main LED
-led = LEDController(LED_PIN)
+led = LEDController(_LED_PIN)
 
 # Initialize the extended LED controller for managing additional LEDs
 ext_leds = ExtendedLEDs(CALL_LED_PINS, PANEL_LED_PINS)
 
 # Initialize the button controller for handling button inputs
-buttons = Buttons(CALL_BUTTON_PINS, PANEL_BUTTON_PINS, PRG_PIN)
+buttons = Buttons(CALL_BUTTON_PINS, PANEL_BUTTON_PINS, _PRG_PIN)
 
 # Initialize the buzzer controller for managing sound feedback
-buzzer = Buzzer(BUZZER_PIN)
+buzzer = Buzzer(_BUZZER_PIN)
 
 # Initialize the Wi-Fi client for managing network connectivity
 wifi_client = WiFiClient(led)
@@ -69,6 +70,9 @@ async def main():
     # Set the LED mode to indicate Wi-Fi connection status
     led.set_mode("wifi_connect")
 
+    # Start the extended LED task that drives call and panel LED blinking
+    asyncio.create_task(ext_leds.run())
+
     # Attempt to connect to Wi-Fi using provided credentials
     if not await wifi_client.connect_to_server(
         GUEST_WIFI, GUEST_SSID, GUEST_PASSWORD, AP_SSID, AP_PASSWORD, SERVER_MAC_ADDR[-4:]
@@ -108,21 +112,13 @@ async def main():
     asyncio.create_task(buttons.run())
     
     try:
-        # Attempt to start the WebSocket connection
-        if not await ws_client.start():
-            # If the connection fails, print an error, set the LED to "not connected," and exit
-            print("Failed to connect to WebSocket")
-            led.set_mode("not_connected")
-            return
+        # Run the WebSocket client; start() reconnects on its own and never returns
+        await ws_client.start()
     except Exception as e:
-        # Handle any WebSocket connection errors
+        # Only an unexpected error escapes the reconnect loop
         print(f"WebSocket connection error: {e}")
         led.set_mode("not_connected")
         return
 
-    # Main loop to keep the program running
-    while True:
-        await asyncio.sleep(1)
-
 # Run the main function using the asyncio event loop
 asyncio.run(main())
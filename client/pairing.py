@@ -1,9 +1,16 @@
 import socket
 import uasyncio as asyncio
 import json
+import time
 import network
+import ubinascii
 from machine import unique_id
 
+# Fixed-schema pairing messages, only the addresses are filled in
+# (str templates: bytes %-formatting of str arguments differs between MicroPython and CPython)
+_PAIRING_TMPL = '{"type":"pairing","ip":"%s","hostname":"esp32-client","mac":"%s"}'
+_PAIRED_TMPL = '{"type":"paired","ip":"%s"}'
+
 class Pairing:
     def __init__(self, led):
         """
@@ -13,6 +20,7 @@ class Pairing:
         """
         self.led = led  # LED controller to visually indicate pairing progress
         self.sock = None  # Placeholder for the UDP socket used for communication
+        self._sta = network.WLAN(network.STA_IF)  # Station interface, queried for the device IP
 
     async def start(self):
         """
@@ -28,47 +36,76 @@ class Pairing:
         print("Starting pairing process...")
         self.led.set_mode("pairing")  # Set LED to indicate pairing mode
 
-        # Send a pairing request 5 times with a delay between each attempt
+        try:
+            # Broadcast in the background and listen at the same time, so the first reply ends pairing
+            send_task = asyncio.create_task(self._send_requests())
+            try:
+                server_ip = await self._wait_for_response()  # Wait for a response from the server
+            finally:
+                send_task.cancel()  # No more requests are needed once we have an answer (or gave up)
+            if server_ip:
+                # If a response is received, send a paired confirmation to the server
+                await self._send_paired_confirmation(server_ip)
+                return server_ip
+            return None  # Return None if no response is received
+        finally:
+            # Pairing is done either way, release the socket and its lwIP buffers
+            self.sock.close()
+            self.sock = None
+
+    async def _send_requests(self):
+        """
+        Broadcast the pairing request 5 times with a delay between each attempt.
+        The delay starts at 100 ms and doubles after every attempt up to 1 second, so a quiet
+        network pairs quickly while a busy one is not flooded.
+        Runs as a separate task and is cancelled as soon as the server answers.
+        """
+        # The request is the same for every attempt, so it is serialized only once
+        message = _PAIRING_TMPL % (self.get_ip(), self.get_mac())  # Device IP and unique MAC address
+        payload = message.encode()
+
+        delay_ms = 100  # Delay before the next attempt
         for i in range(5):
-            message = json.dumps({
-                "type": "pairing",  # Message type to identify the request
-                "ip": self.get_ip(),  # IP address of the device
-                "hostname": "esp32-client",  # Hostname for identification
-                "mac": self.get_mac()  # Unique MAC address of the device
-            })
             print(f"Sent message: {message}")  # Log the message being sent
-            self.sock.sendto(message.encode(), ("255.255.255.255", 5000))  # Broadcast the message
+            self.sock.sendto(payload, ("255.255.255.255", 5000))  # Broadcast the message
             print(f"Sent pairing request {i + 1}/5")  # Log the attempt number
-            await asyncio.sleep(1)  # Wait 1 second before sending the next request
-
-        # Wait for a response from the server
-        server_ip = await self._wait_for_response()
-        if server_ip:
-            # If a response is received, send a paired confirmation to the server
-            await self._send_paired_confirmation(server_ip)
-            return server_ip
-        return None  # Return None if no response is received
+            await asyncio.sleep_ms(delay_ms)  # Wait before sending the next request
+            delay_ms = min(delay_ms * 2, 1000)  # Back off, at most 1 second between attempts
 
     async def _wait_for_response(self):
         """
-        Wait for a response from the server after sending the pairing requests.
+        Wait for a response from the server while the pairing requests are being sent.
+        The socket is awaited through the asyncio I/O queue, so a reply is handled as soon as
+        it arrives instead of on the next poll.
         Returns:
             The server's IP address if a response is received, or None if no response is received.
         """
-        for i in range(10):  # Wait for up to 10 seconds
+        reader = asyncio.StreamReader(self.sock)  # Lets the scheduler wake us when a datagram is ready
+        # Wait for up to 15 seconds, the broadcasts are sent during this window
+        deadline = time.ticks_add(time.ticks_ms(), 15000)
+        print("Waiting for server response...")
+        while True:
+            remaining = time.ticks_diff(deadline, time.ticks_ms())
+            if remaining <= 0:
+                break
+            try:
+                data = await asyncio.wait_for_ms(reader.read(1024), remaining)
+            except asyncio.TimeoutError:
+                break
+            except OSError as e:
+                # Socket error on this receive: keep listening until the deadline, as before
+                print(f"Error: {e}")
+                await asyncio.sleep_ms(50)  # Do not spin if the error repeats
+                continue
             try:
-                # Try to receive data from the socket
-                data, addr = self.sock.recvfrom(1024)
-                message = json.loads(data.decode())  # Decode the received JSON message
+                message = json.loads(data)  # Decode the received JSON message
                 if message.get("type") == "hello":  # Check if the message type is "hello"
-                    print(f"Received hello from {addr}")  # Log the server's address
+                    print(f"Received hello from {message['ip']}")  # Log the server's address
                     return message["ip"]  # Return the server's IP address
             except Exception as e:
-                # Handle any exceptions during the receiving process
+                # Handle any exceptions while decoding the datagram
                 print(f"Error: {e}")
-            print(f"Waiting for server response ({i + 1}/10)...")  # Log the waiting status
-            await asyncio.sleep(1)  # Wait 1 second before retrying
-        return None  # Return None if no response is received after 10 attempts
+        return None  # Return None if no response is received within 15 seconds
 
     async def _send_paired_confirmation(self, server_ip):
         """
@@ -76,10 +113,7 @@ class Pairing:
         Args:
             server_ip: The IP address of the server.
         """
-        message = json.dumps({
-            "type": "paired",  # Message type to identify the confirmation
-            "ip": server_ip  # Include the server's IP address
-        })
+        message = _PAIRED_TMPL % server_ip  # Include the server's IP address
         self.sock.sendto(message.encode(), (server_ip, 5000))  # Send the confirmation message
         print(f"Sent paired confirmation to {server_ip}")  # Log the confirmation sent
 
@@ -89,7 +123,7 @@ class Pairing:
         Returns:
             The IP address as a string.
         """
-        return network.WLAN(network.STA_IF).ifconfig()[0]  # Retrieve the IP address from the network interface
+        return self._sta.ifconfig()[0]  # Retrieve the IP address from the network interface
 
     def get_mac(self):
         """
@@ -97,4 +131,4 @@ class Pairing:
         Returns:
             The MAC address as a string of hexadecimal values.
         """
-        return "".join("{:02x}".format(b) for b in unique_id())  # Generate MAC address from unique ID
\ No newline at end of file
+        return ubinascii.hexlify(unique_id()).decode()  # Generate MAC address from unique ID
\ No newline at end of file
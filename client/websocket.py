@@ -2,6 +2,41 @@ import usocket as socket
 import uasyncio as asyncio
 import json
 import time
+import struct
+import micropython
+from micropython import const
+
+# Outbound messages queued within this window are coalesced into a single frame
+TX_BATCH_MS = const(5)
+# Largest accepted frame payload, the control protocol only exchanges small JSON messages
+MAX_FRAME_SIZE = const(4096)
+# Number of elevators served by the server, elevator IDs are 0..MAX_ELEVATORS-1
+MAX_ELEVATORS = const(3)
+
+# Pre-serialized outbound messages, only the integer fields are filled in per send
+_CALL_TMPL = b'{"call":{"floor":%d,"elevator":%d}}'
+_TASK_TMPL = b'{"task":{"id":%d,"motor":%d,"floor":%d,"action":"move"}}'
+_STATUS_TMPL = b'{"status":{"task_id":%d}}'
+_RESET_MSG = b'{"reset":{}}'
+
+@micropython.viper
+def _unmask(buf: ptr8, key: ptr8, n: int):
+    """
+    Remove the WebSocket masking from a payload in place.
+    Four bytes are XORed at a time with the key loaded as one 32-bit word,
+    the last 0-3 bytes one by one. Compiled to native code, it allocates nothing.
+
+    Args:
+        buf: Buffer holding the masked payload at its start (word-aligned, the receive buffer).
+        key: The 4-byte masking key from the frame header.
+        n: Payload length in bytes.
+    """
+    k = key[0] | (key[1] << 8) | (key[2] << 16) | (key[3] << 24)  # Little-endian, like the words below
+    words = ptr32(buf)
+    for i in range(n >> 2):
+        words[i] = words[i] ^ k
+    for i in range(n - (n & 3), n):
+        buf[i] = buf[i] ^ key[i & 3]
 
 class WebSocketClient:
     def __init__(self, server_ip, led, buttons, buzzer, ext_leds):
@@ -18,6 +53,16 @@ class WebSocketClient:
             ext_leds (ExtendedLEDs): Controller for managing additional LEDs (call and panel LEDs).
         """
         self.server_ip = server_ip  # IP address of the WebSocket server
+        # The upgrade request only depends on the server IP, so it is encoded once for all reconnects
+        request = (
+            "GET / HTTP/1.1\r\n"
+            "Host: %s\r\n"  # Specify the server address in the Host header
+            "Upgrade: websocket\r\n"  # Indicate the intention to upgrade to WebSocket
+            "Connection: Upgrade\r\n"
+            "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"  # Required key for WebSocket handshake
+            "Sec-WebSocket-Version: 13\r\n\r\n"  # Specify WebSocket protocol version
+        ) % server_ip
+        self._handshake_request = request.encode()  # Sent as-is by handshake()
         self.led = led  # LEDController instance to provide visual feedback
         self.buttons = buttons  # Instance to manage button events
         self.buzzer = buzzer  # Buzzer instance for sound signals
@@ -26,18 +71,34 @@ class WebSocketClient:
         self.writer = None  # StreamWriter instance for sending messages to the server
         self.task = 0  # Identifier for the current task being executed
         self.active_timer = None  # Timer for monitoring active tasks
-        self.active_elevators = {}  # Dictionary to track active elevators and their tasks
-        self._active_tasks_lock = asyncio.Lock()  # Async lock to ensure thread-safe task management
+        self.active_elevators = bytearray(MAX_ELEVATORS)  # 1 = panel is active for the elevator ID
+        self._reset_tasks = [None] * MAX_ELEVATORS  # Pending deactivation task per elevator ID
+        self.current_call_led_task = None  # Task holding the call LED while a call is processed
+        self.current_task_led_task = None  # Task holding the panel LED while a task is processed
+        self._tx_queue = []  # Outbound messages waiting for the writer task
+        self._tx_event = asyncio.Event()  # Set when the outbound queue is not empty
+        self._writer_task = None  # Background task draining the outbound queue
+        self._rxbuf = bytearray(MAX_FRAME_SIZE)  # Reused for every received frame
+        self._rxmv = memoryview(self._rxbuf)  # Slices of it are filled without copying
+        self._rxkey = bytearray(4)  # Masking key of the current frame
+        self._txbuf = bytearray(MAX_FRAME_SIZE)  # Reused to assemble every outgoing frame
+        self._txmv = memoryview(self._txbuf)
 
     async def start(self):
         """
         Starts the WebSocket client. This method attempts to establish a connection to the 
         WebSocket server, perform the handshake, and then listens for and processes incoming messages.
 
-        If the connection fails, it retries after a delay of 5 seconds.
+        If the connection fails or is closed, it retries after a delay that starts at 0.5 seconds and
+        doubles after every failed attempt, up to 5 seconds.
         """
         self.led.set_mode("connecting")  # Set the LED to indicate the connection process
+        if self._writer_task is None:
+            # Start the task that sends queued messages once for the client lifetime
+            self._writer_task = asyncio.create_task(self._writer())
+        retry_delay_ms = 500  # Delay before the next reconnection attempt
         while True:  # Infinite loop to attempt reconnection in case of failure
+            writer = None
             try:
                 print(f"Connecting to WebSocket at {self.server_ip}...")
                 # Establish a TCP connection to the server on port 80
@@ -50,6 +111,7 @@ class WebSocketClient:
                 self.connected = True  # Mark the connection as successful
                 self.led.set_mode("connected")  # Update LED to indicate a successful connection
                 print("Connected to WebSocket")
+                retry_delay_ms = 500  # The link works again, the next drop retries quickly
                 
                 # Continuously read and process incoming messages from the server
                 while True:
@@ -61,8 +123,16 @@ class WebSocketClient:
             # Handle connection errors and retry after a delay
             except Exception as e:
                 print(f"WebSocket connection failed: {e}")
-                self.led.set_mode("not_connected")  # Update LED to indicate disconnection
-                await asyncio.sleep(5)  # Wait 5 seconds before retrying
+
+            self.connected = False  # Stop the writer task from using the broken connection
+            self.led.set_mode("not_connected")  # Update LED to indicate disconnection
+            if writer is not None:
+                try:
+                    writer.close()  # Free the old socket now instead of leaving it to the GC
+                except Exception:
+                    pass
+            await asyncio.sleep_ms(retry_delay_ms)  # Wait before retrying
+            retry_delay_ms = min(retry_delay_ms * 2, 5000)  # Back off on repeated failures
 
     async def handshake(self, reader, writer):
         """
@@ -76,16 +146,7 @@ class WebSocketClient:
         Raises:
             ValueError: If the server does not respond with a "101 Switching Protocols" status.
         """
-        # Format the WebSocket handshake request
-        request = (
-            "GET / HTTP/1.1\r\n"
-            "Host: {}\r\n"  # Specify the server address in the Host header
-            "Upgrade: websocket\r\n"  # Indicate the intention to upgrade to WebSocket
-            "Connection: Upgrade\r\n"
-            "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"  # Required key for WebSocket handshake
-            "Sec-WebSocket-Version: 13\r\n\r\n"  # Specify WebSocket protocol version
-        ).format(self.server_ip)
-        writer.write(request.encode())  # Send the handshake request
+        writer.write(self._handshake_request)  # Send the pre-encoded handshake request
         await writer.drain()  # Ensure the request is fully sent to the server
 
         # Read the server's response
@@ -94,72 +155,157 @@ class WebSocketClient:
             # If the response does not include the expected status, raise an error
             raise ValueError("WebSocket handshake failed")
 
+    async def _read_into(self, reader, buf, n):
+        """
+        Fill the first n bytes of buf from the stream, reading as many times as needed.
+
+        Args:
+            reader (StreamReader): StreamReader for reading data from the server.
+            buf (memoryview): Destination buffer.
+            n (int): Number of bytes to read.
+
+        Returns:
+            bool: True if all bytes were read, False if the connection was closed.
+        """
+        pos = 0
+        while pos < n:
+            count = await reader.readinto(buf[pos:n])
+            if not count:
+                return False  # Connection closed by the server
+            pos += count
+        return True
+
     async def receive_frame(self, reader):
         """
         Receive a WebSocket frame from the server. This method decodes the frame header, 
         extracts the payload, and processes masking if applicable.
+        The payload is read into a buffer kept by the client and unmasked there, so no payload
+        buffer is allocated per frame; only the small memoryview slices used for reading are.
 
         Args:
             reader (StreamReader): StreamReader for reading data from the server.
 
+        Raises:
+            ValueError: If the payload is larger than MAX_FRAME_SIZE.
+
         Returns:
-            str: Decoded message payload if the frame is a text frame, None otherwise.
+            memoryview: Raw message payload if the frame is a text frame, None otherwise.
+                It points into the receive buffer and is only valid until the next call.
+                `json.loads()` accepts it directly, so the payload is not decoded to str.
         """
-        header = await reader.read(2)  # Read the first two bytes of the frame header
-        if not header:  # Return None if no data is received
-            return None
+        buf = self._rxmv
+        if not await self._read_into(reader, buf, 2):  # Read the first two bytes of the frame header
+            return None  # Return None if no data is received
 
         # Extract frame metadata from the header
-        fin = (header[0] & 0x80) >> 7  # Final frame flag
-        opcode = header[0] & 0x0F  # Opcode indicating the frame type (e.g., text, binary)
-        mask = (header[1] & 0x80) >> 7  # Mask flag
-        length = header[1] & 0x7F  # Payload length (7 bits)
+        fin = (buf[0] & 0x80) >> 7  # Final frame flag
+        opcode = buf[0] & 0x0F  # Opcode indicating the frame type (e.g., text, binary)
+        mask = (buf[1] & 0x80) >> 7  # Mask flag
+        length = buf[1] & 0x7F  # Payload length (7 bits)
 
         # Handle extended payload lengths (126 or 127 bytes)
         if length == 126:
-            length = int.from_bytes(await reader.read(2), "big")  # Read 16-bit length
+            if not await self._read_into(reader, buf, 2):  # Read 16-bit length
+                return None
+            length = struct.unpack_from(">H", self._rxbuf, 0)[0]
         elif length == 127:
-            length = int.from_bytes(await reader.read(8), "big")  # Read 64-bit length
+            if not await self._read_into(reader, buf, 8):  # Read 64-bit length
+                return None
+            length = struct.unpack_from(">Q", self._rxbuf, 0)[0]
 
         # Read the masking key if the mask flag is set
-        if mask:
-            masking_key = await reader.read(4)
+        if mask and not await self._read_into(reader, memoryview(self._rxkey), 4):
+            return None
+
+        # Reject oversized frames before reading them, start() then reconnects
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"WebSocket frame too large: {length} bytes")
 
         # Read the payload data
-        data = await reader.read(length)
+        if not await self._read_into(reader, buf, length):
+            return None
         if mask:
-            # Apply the masking key to decode the payload
-            data = bytes([data[i] ^ masking_key[i % 4] for i in range(len(data))])
+            # Apply the masking key to decode the payload (servers normally do not mask)
+            _unmask(self._rxbuf, self._rxkey, length)
 
-        # If the frame is a text frame (opcode 0x1), decode and return the payload
+        # If the frame is a text frame (opcode 0x1), return the payload
         if opcode == 0x1:
-            return data.decode()
+            return buf[:length]
         return None  # Return None for non-text frames
 
     async def send_frame(self, writer, data):
         """
         Send a WebSocket frame to the server. This method constructs the frame header, 
-        appends the payload, and ensures the frame is sent.
+        appends the payload, and ensures the frame is sent with a single write.
 
         Args:
             writer (StreamWriter): StreamWriter for sending data to the server.
-            data (str): The message to send as a WebSocket frame.
+            data (bytes): The message to send as a WebSocket frame, already encoded.
         """
-        header = bytearray()  # Initialize the frame header
-        header.append(0x80 | 0x1)  # Final frame flag and opcode for text frame
-        if len(data) < 126:
-            header.append(len(data))  # Small payload length
-        elif len(data) < 65536:
-            header.append(126)  # Extended payload length (16-bit)
-            header.extend(len(data).to_bytes(2, "big"))
+        length = len(data)
+        # Header size: 2 bytes plus the extended payload length, if any
+        if length < 126:
+            header_len = 2
+        elif length < 65536:
+            header_len = 4
+        else:
+            header_len = 10
+
+        # Assemble header and payload in one buffer, so the frame goes out in one write.
+        # The shared buffer is safe to reuse: only the writer task sends, and it drains before returning.
+        size = header_len + length
+        if size <= MAX_FRAME_SIZE:
+            frame = self._txbuf
+        else:
+            frame = bytearray(size)  # Unusually large batch, fall back to a one-off buffer
+        frame[0] = 0x80 | 0x1  # Final frame flag and opcode for text frame
+        if header_len == 2:
+            frame[1] = length  # Small payload length
+        elif header_len == 4:
+            frame[1] = 126  # Extended payload length (16-bit)
+            struct.pack_into(">H", frame, 2, length)
         else:
-            header.append(127)  # Extended payload length (64-bit)
-            header.extend(len(data).to_bytes(8, "big"))
+            frame[1] = 127  # Extended payload length (64-bit)
+            struct.pack_into(">Q", frame, 2, length)
+        frame[header_len:size] = data  # Copy the payload behind the header
 
-        writer.write(header)  # Write the frame header
-        writer.write(data.encode())  # Write the payload
+        writer.write(self._txmv[:size] if frame is self._txbuf else frame)  # Write the whole frame
         await writer.drain()  # Flush the data to the server to ensure it's sent
 
+    async def _writer(self):
+        """
+        Background task that drains the outbound queue.
+        Messages queued within TX_BATCH_MS of each other are sent together in one frame:
+        a single message keeps its plain JSON envelope, several are joined into a JSON array.
+        """
+        while True:
+            await self._tx_event.wait()  # Sleep until something is queued
+            await asyncio.sleep_ms(TX_BATCH_MS)  # Let close-together messages pile up
+            self._tx_event.clear()
+            batch = self._tx_queue  # Take the whole queue at once
+            self._tx_queue = []
+
+            if not self.connected:
+                print(f"WebSocket not connected, dropping {len(batch)} message(s)")
+                continue
+
+            message = batch[0] if len(batch) == 1 else b"[" + b",".join(batch) + b"]"
+            try:
+                await self.send_frame(self.writer, message)  # One frame for the whole batch
+            except Exception as e:
+                # Keep the writer alive, the reader loop takes care of reconnecting
+                print(f"WebSocket send failed: {e}")
+
+    def _queue_message(self, message):
+        """
+        Queue a message for the writer task instead of writing it to the socket right away.
+
+        Args:
+            message (bytes): The message to send, already serialized to JSON.
+        """
+        self._tx_queue.append(message)  # Add the message to the outbound queue
+        self._tx_event.set()  # Wake up the writer task
+
     async def _reset_active_elevator(self, elevator_id):
         """
         Deactivate the elevator's active status after a delay.
@@ -170,9 +316,9 @@ class WebSocketClient:
         """
         try:
             await asyncio.sleep(3)  # Wait for 3 seconds before deactivating
-            async with self._active_tasks_lock:  # Acquire the lock to ensure thread-safe access
-                if elevator_id in self.active_elevators:
-                    del self.active_elevators[elevator_id]  # Remove the elevator from the active list
+            # No lock needed: nothing here awaits, so no other task can run in between
+            self.active_elevators[elevator_id] = 0  # Mark the elevator as inactive
+            self._reset_tasks[elevator_id] = None
             print(f"Elevator {elevator_id} deactivated")  # Log the deactivation
         except asyncio.CancelledError:
             # Handle the case where the task is cancelled before completion
@@ -184,7 +330,7 @@ class WebSocketClient:
         Messages can include updates about elevator calls, task completions, or other events.
 
         Args:
-            message (str): The message received from the WebSocket server, in JSON format.
+            message (memoryview): The message received from the WebSocket server, in JSON format.
         """
         try:
             data = json.loads(message)  # Parse the JSON message
@@ -204,22 +350,32 @@ class WebSocketClient:
                         elevator_id = resp.get("elevator", 0)  # Extract the elevator ID (default to 0)
 
                         # Cancel any ongoing LED hold task for the floor
-                        if hasattr(self, 'current_call_led_task'):
-                            self.current_call_led_task.cancel()
+                        hold_task = self.current_call_led_task
+                        if hold_task is not None:
+                            self.current_call_led_task = None
+                            hold_task.cancel()
+                            try:
+                                await hold_task  # Let it turn the LED off before blinking
+                            except asyncio.CancelledError:
+                                # Handle task cancellation gracefully
+                                pass
 
                         # Blink the call LED and trigger the buzzer for elevator arrival
-                        asyncio.create_task(self.ext_leds.blink_call_led(floor))
+                        self.ext_leds.blink_call_led(floor)
                         asyncio.create_task(self.buzzer.elevator_signal("arrival"))
 
                         # Manage the active elevator status
-                        async with self._active_tasks_lock:
-                            if elevator_id in self.active_elevators:
-                                self.active_elevators[elevator_id].cancel()  # Cancel any existing task for the elevator
+                        if 0 <= elevator_id < MAX_ELEVATORS:
+                            # No lock needed: this block never awaits, so it runs without interruption
+                            reset_task = self._reset_tasks[elevator_id]
+                            if reset_task:
+                                reset_task.cancel()  # Cancel any existing task for the elevator
 
                             # Start a new task to reset the elevator after a delay
-                            self.active_elevators[elevator_id] = asyncio.create_task(
+                            self._reset_tasks[elevator_id] = asyncio.create_task(
                                 self._reset_active_elevator(elevator_id)
                             )
+                            self.active_elevators[elevator_id] = 1  # Mark the elevator as active
                             print(f"Elevator {elevator_id} activated for floor {floor}")
 
                 elif resp["type"] == "task":  # Handle task-related messages
@@ -232,16 +388,18 @@ class WebSocketClient:
                         floor = resp["floor"]  # Extract the floor number
 
                         # Cancel any ongoing LED hold task for the floor
-                        if hasattr(self, 'current_task_led_task'):
-                            self.current_task_led_task.cancel()
+                        hold_task = self.current_task_led_task
+                        if hold_task is not None:
+                            self.current_task_led_task = None
+                            hold_task.cancel()
                             try:
-                                await self.current_task_led_task  # Wait for the task to complete
+                                await hold_task  # Wait for the task to complete
                             except asyncio.CancelledError:
                                 # Handle task cancellation gracefully
                                 pass
 
                         # Blink the panel LED and trigger a melody on the buzzer
-                        asyncio.create_task(self.ext_leds.blink_panel_led(floor))
+                        self.ext_leds.blink_panel_led(floor)
                         asyncio.create_task(self.buzzer.melody())
 
         except Exception as e:
@@ -264,8 +422,8 @@ class WebSocketClient:
                 else:
                     self.ext_leds.panel_leds[led_index].on()  # Turn on the panel LED for the floor
 
-                while True:
-                    await asyncio.sleep(1)  # Keep the LED on indefinitely until cancelled
+                # Suspend on an event that is never set, the task only resumes when cancelled
+                await asyncio.Event().wait()
 
         except asyncio.CancelledError:
             # Handle task cancellation by turning off the LED
@@ -287,13 +445,7 @@ class WebSocketClient:
             floor (int): The floor number to call the elevator to.
             elevator (int): The elevator ID (default is 0).
         """
-        message = json.dumps({
-            "call": {
-                "floor": floor,  # Floor number
-                "elevator": elevator  # Elevator ID
-            }
-        })
-        await self.send_frame(self.writer, message)  # Send the call request to the server
+        self._queue_message(_CALL_TMPL % (floor, elevator))  # Queue the call request for the server
 
     async def send_task(self, floor, motor):
         """
@@ -301,36 +453,22 @@ class WebSocketClient:
 
         Args:
             floor (int): The floor number to move the elevator to.
-            motor (str): The motor type or direction (e.g., "up", "down").
+            motor (int): The elevator ID whose motor should move.
         """
         print(f"[CLIENT DEBUG] Sending task: motor={motor}, floor={floor}")  # Debug log for the task
         self.task = hash((floor, motor, time.ticks_ms())) % 1000  # Generate a unique task ID
-        message = json.dumps({
-            "task": {
-                "id": self.task,  # Unique task ID
-                "motor": motor,  # Motor type or direction
-                "floor": floor,  # Floor number
-                "action": "move"  # Action type
-            }
-        })
-        await self.send_frame(self.writer, message)  # Send the task request to the server
+        self._queue_message(_TASK_TMPL % (self.task, motor, floor))  # Queue the task request for the server
 
     async def send_status(self):
         """
         Send the current task status to the server.
         This includes the ID of the last task initiated by the client.
         """
-        message = json.dumps({
-            "status": {
-                "task_id": self.task  # ID of the current task
-            }
-        })
-        await self.send_frame(self.writer, message)  # Send the status update to the server
+        self._queue_message(_STATUS_TMPL % self.task)  # Queue the status update for the server
 
     async def send_reset(self):
         """
         Send a reset command to the server to clear any ongoing tasks or states.
         This is typically used for error recovery or reinitialization.
         """
-        message = json.dumps({"reset": {}})  # Create a reset command message
-        await self.send_frame(self.writer, message)  # Send the reset command to the server
\ No newline at end of file
+        self._queue_message(_RESET_MSG)  # Queue the reset command for the server
\ No newline at end of file
@@ -15,13 +15,13 @@ class WiFiClient:
 
     async def scan_networks(self):
         """
-        Scan for available Wi-Fi networks and return a list of SSID names.
+        Scan for available Wi-Fi networks and return the set of SSID names.
         Returns:
-            A list of SSIDs of the available networks.
+            A set of SSIDs of the available networks, for fast membership checks.
         """
         self.sta.active(True)  # Activate the Wi-Fi interface
         networks = self.sta.scan()  # Scan for networks
-        ssids = [network[0].decode() for network in networks]  # Extract SSID names
+        ssids = {network[0].decode() for network in networks}  # Extract SSID names
         print(f"Available networks: {ssids}")  # Log the available networks
         return ssids
 
@@ -45,7 +45,7 @@ class WiFiClient:
                 # Exit if the connection takes longer than the timeout period
                 print(f"Timeout connecting to {ssid}")
                 return False
-            await asyncio.sleep(1)  # Wait for 1 second before retrying
+            await asyncio.sleep_ms(50)  # Check again shortly, association usually takes well under a second
 
         self.connected = True  # Update the connection status flag
         print(f"Connected to {ssid}")  # Log successful connection
@@ -83,6 +83,9 @@ class WiFiClient:
         Returns:
             True if the connection is successful.
         """
+        # Construct the full SSID of the server's AP using its MAC address suffix
+        server_ssid = f"{ap_ssid}-{server_mac_suffix}"
+
         while True:
             try:
                 # Scan for available networks
@@ -96,8 +99,6 @@ class WiFiClient:
                     else:
                         print(f"Guest network {guest_ssid} not found")
                 else:
-                    # Construct the full SSID of the server's AP using its MAC address suffix
-                    server_ssid = f"{ap_ssid}-{server_mac_suffix}"
                     if server_ssid in ssids:  # Check if the server AP is available
                         print(f"Connecting to server AP: {server_ssid}")
                         if await self.connect(server_ssid, ap_password):
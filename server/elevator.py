@@ -1,5 +1,14 @@
 import uasyncio as asyncio
-from typing import Optional, Dict, List, Tuple, Any
+from collections import deque
+from micropython import const
+from typing import Optional, Dict, Tuple, Any
+
+# Capacity of the call queue and of each elevator's destination queue
+QUEUE_MAXLEN = const(32)
+# Floors are numbered 1..MAX_FLOOR, one bit each in the queued-floor mask
+MAX_FLOOR = const(3)
+# Set to 1 to log queue and dispatch decisions
+_DEBUG = const(0)
 
 class ElevatorManager:
     """
@@ -16,14 +25,16 @@ class ElevatorManager:
         """
         self.motors = motor_controller
         self.elevators: Dict[int, Dict[str, Any]] = {
-            0: {'floor': 1, 'target': None, 'status': 'idle', 'queue': [], 'active': False},
-            1: {'floor': 1, 'target': None, 'status': 'idle', 'queue': [], 'active': False},
-            2: {'floor': 1, 'target': None, 'status': 'idle', 'queue': [], 'active': False}
+            0: {'floor': 1, 'target': None, 'status': 'idle', 'queue': deque((), QUEUE_MAXLEN), 'active': False},
+            1: {'floor': 1, 'target': None, 'status': 'idle', 'queue': deque((), QUEUE_MAXLEN), 'active': False},
+            2: {'floor': 1, 'target': None, 'status': 'idle', 'queue': deque((), QUEUE_MAXLEN), 'active': False}
         }
-        self.call_queue: List[Tuple[int, Optional[int]]] = []  # (floor, preferred_elevator)
+        self.call_queue: deque = deque((), QUEUE_MAXLEN)  # (floor, preferred_elevator) tuples
+        self._queued_floors: int = 0  # Bit (floor - 1) set while that floor has a call in call_queue
         self.lock = asyncio.Lock()  # Protect shared state
+        self._queue_nonempty = asyncio.Event()  # Set while call_queue may hold calls
 
-    async def call_elevator(self, floor: int, preferred_elevator: Optional[int] = None) -> Dict[str, int]:
+    async def call_elevator(self, floor: int, preferred_elevator: Optional[int] = None) -> Optional[Dict[str, int]]:
         """
         Handle external call to bring an elevator to the requested floor.
 
@@ -32,11 +43,18 @@ class ElevatorManager:
             preferred_elevator: Specific elevator ID if preferred.
 
         Returns:
-            Dict with selected elevator ID and target floor.
+            Dict with selected elevator ID and target floor, or None if the floor is out of range.
         """
         print(f"Call received for floor {floor}, preferred elevator: {preferred_elevator}")
+        if not 1 <= floor <= MAX_FLOOR:
+            return None  # No such floor, nothing is queued
         async with self.lock:
-            self.call_queue.append((floor, preferred_elevator))
+            # Queue each floor once, repeated presses of the same call button are dropped
+            bit = 1 << (floor - 1)
+            if not self._queued_floors & bit:
+                self._queued_floors |= bit
+                self.call_queue.append((floor, preferred_elevator))
+                self._queue_nonempty.set()  # Wake _process_queues()
 
         if preferred_elevator is not None and preferred_elevator in self.elevators:
             if self.elevators[preferred_elevator]['status'] == 'idle':
@@ -52,18 +70,31 @@ class ElevatorManager:
         """
         while True:
             async with self.lock:
-                if not self.call_queue:
-                    await asyncio.sleep(0.1)
-                    continue
-
-                floor, preferred = self.call_queue.pop(0)
-                elevator_id = await self._select_best_elevator(floor)
+                if self.call_queue:
+                    floor, preferred = self.call_queue.popleft()
+                    if not 1 <= floor <= MAX_FLOOR:
+                        continue  # No such floor, drop the call
+                    self._queued_floors &= ~(1 << (floor - 1))
+                else:
+                    floor = None
+                    self._queue_nonempty.clear()
+
+            if floor is None:
+                # Nothing queued, sleep until call_elevator() adds a call
+                await self._queue_nonempty.wait()
+                continue
+
+            # _select_best_elevator() takes the lock itself, so it is called unlocked
+            elevator_id = await self._select_best_elevator(floor)
+            if _DEBUG:
                 print(f"elevator_id: {elevator_id}")
 
-                if elevator_id is None:
+            if elevator_id is None:
+                async with self.lock:
+                    self._queued_floors |= 1 << (floor - 1)
                     self.call_queue.append((floor, preferred))
-                    await asyncio.sleep(1)
-                    continue
+                await asyncio.sleep(1)
+                continue
 
             await self._assign_floor(elevator_id, floor)
 
@@ -83,26 +114,26 @@ class ElevatorManager:
             Elevator ID (int) or None.
         """
         async with self.lock:
-            # 1. Check if an elevator is already on the floor and idle
-            for elev_id, elev in self.elevators.items():
-                if elev['floor'] == floor and elev['status'] == 'idle':
-                    return elev_id
-
-            # 2. Find the closest idle elevator
-            available = []
+            # All three rules are evaluated in one pass over the elevators
+            best_id = None  # Closest idle elevator
+            best_distance = 1 << 30
+            queue_id = None  # Elevator with the shortest queue
+            min_queue = 1 << 30
             for elev_id, elev in self.elevators.items():
                 if elev['status'] == 'idle':
                     distance = abs(elev['floor'] - floor)
-                    available.append((elev_id, distance))
-
-            if available:
-                return min(available, key=lambda x: x[1])[0]
-
-            # 3. If all are busy, choose one with the smallest queue
-            min_queue = min(len(e['queue']) for e in self.elevators.values())
-            for elev_id, elev in self.elevators.items():
-                if len(elev['queue']) == min_queue:
-                    return elev_id
+                    if distance == 0:
+                        return elev_id  # 1. Idle elevator already on the floor
+                    if distance < best_distance:
+                        best_id, best_distance = elev_id, distance  # 2. Closest idle so far
+                queue_len = len(elev['queue'])
+                if queue_len < min_queue:
+                    queue_id, min_queue = elev_id, queue_len  # 3. Shortest queue so far
+
+            if best_id is not None:
+                return best_id
+            if queue_id is not None:
+                return queue_id
 
             return 0  # Default fallback
 
@@ -115,23 +146,28 @@ class ElevatorManager:
             floor: The target floor.
         """
         elev = self.elevators[elevator_id]
-        if floor == elev['floor']:
-            async with self.lock:
+        async with self.lock:
+            if floor == elev['floor']:
                 elev['active'] = True
-            return
-
-        elev['target'] = floor
-        elev['status'] = 'moving'
+                return
+            elev['target'] = floor
+            elev['status'] = 'moving'
 
+        # The move itself runs unlocked so other elevators can be dispatched meanwhile
         try:
             await self.motors.move_to_floor(elevator_id, floor)
-            async with self.lock:
+            ok = True
+        except Exception as e:
+            ok = False
+
+        # Commit the outcome of the move in one critical section
+        async with self.lock:
+            if ok:
                 elev['floor'] = floor
                 elev['target'] = None
                 elev['status'] = 'idle'
                 elev['active'] = True
-        except Exception as e:
-            async with self.lock:
+            else:
                 elev['status'] = 'error'
                 elev['active'] = False
 
@@ -153,7 +189,8 @@ class ElevatorManager:
             elevator_id: Elevator index to move.
             floor: Target floor.
         """
-        print(f"[ELEVATOR DEBUG] Sending elevator {elevator_id} to floor {floor}")
+        if _DEBUG:
+            print(f"[ELEVATOR DEBUG] Sending elevator {elevator_id} to floor {floor}")
         if elevator_id not in self.elevators:
             raise ValueError(f"Invalid elevator ID: {elevator_id}")
 
@@ -167,9 +204,10 @@ class ElevatorManager:
         Args:
             elevator_id: Elevator to process queue for.
         """
-        print(f"[QUEUE DEBUG] Processing queue for elevator {elevator_id}")
+        if _DEBUG:
+            print(f"[QUEUE DEBUG] Processing queue for elevator {elevator_id}")
         while self.elevators[elevator_id]['queue']:
-            floor = self.elevators[elevator_id]['queue'].pop(0)
+            floor = self.elevators[elevator_id]['queue'].popleft()
             await self._assign_floor(elevator_id, floor)
 
     async def reset_all(self):
@@ -177,7 +215,7 @@ class ElevatorManager:
         Resets all elevators to floor 1 and clears all queues.
         """
         for elev_id in self.elevators:
-            self.elevators[elev_id]['queue'] = []
+            self.elevators[elev_id]['queue'] = deque((), QUEUE_MAXLEN)
             self.elevators[elev_id]['target'] = None
             self.elevators[elev_id]['status'] = 'idle'
             await self.motors.move_to_floor(elev_id, 1)
@@ -16,43 +16,66 @@ class LEDController:
         self.led = Pin(pin, Pin.OUT)
         self.mode: str = "idle"
         self.led.value(0)  # Turn LED off initially
+        self._mode_changed = asyncio.Event()  # Set by set_mode(), steady modes sleep on it
 
-    async def run(self):
+        # Mode -> coroutine playing one cycle of the mode's pattern
+        self._handlers = {
+            "not_connected": self._blink_fast,  # Not connected to Wi-Fi
+            "wifi_connect": self._blink_fast,  # Connecting to Wi-Fi
+            "pairing": self._blink_triple,
+            "connecting": self._blink_medium,
+            "connected": self._solid_on,
+        }
+
+    async def _blink_fast(self):
         """
-        Main loop to update LED state based on current mode.
-        This function should be run as an asyncio task.
+        Fast blink (100 ms): not connected or connecting to Wi-Fi.
         """
-        while True:
-            if self.mode == "not_connected":
-                # Fast blink: Not connected to Wi-Fi
-                self.led.value(not self.led.value())
-                await asyncio.sleep_ms(100)
+        self.led.value(not self.led.value())
+        await asyncio.sleep_ms(100)
 
-            elif self.mode == "wifi_connect":
-                # Fast blink: Connecting to Wi-Fi
-                self.led.value(not self.led.value())
-                await asyncio.sleep_ms(100)
+    async def _blink_triple(self):
+        """
+        Triple blink followed by a 1 s pause: in pairing mode.
+        """
+        for _ in range(3):
+            self.led.value(1)
+            await asyncio.sleep_ms(100)
+            self.led.value(0)
+            await asyncio.sleep_ms(100)
+        await asyncio.sleep_ms(1000)
 
-            elif self.mode == "pairing":
-                # Triple blink: In pairing mode
-                for _ in range(3):
-                    self.led.value(1)
-                    await asyncio.sleep_ms(100)
-                    self.led.value(0)
-                    await asyncio.sleep_ms(100)
-                await asyncio.sleep_ms(1000)
+    async def _blink_medium(self):
+        """
+        Medium blink (500 ms): connecting to client.
+        """
+        self.led.value(not self.led.value())
+        await asyncio.sleep_ms(500)
 
-            elif self.mode == "connecting":
-                # Medium blink: Connecting to client
-                self.led.value(not self.led.value())
-                await asyncio.sleep_ms(500)
+    async def _solid_on(self):
+        """
+        Solid ON until the mode changes: fully connected.
+        """
+        self.led.value(1)
+        await self._wait_mode_change()
 
-            elif self.mode == "connected":
-                # Solid ON: Fully connected
-                self.led.value(1)
-                await asyncio.sleep_ms(100)
+    async def run(self):
+        """
+        Main loop to update LED state based on current mode.
+        This function should be run as an asyncio task.
+        """
+        handlers = self._handlers
+        # Modes without a pattern (idle, error) leave the LED as is until the mode changes
+        no_pattern = self._wait_mode_change
+        while True:
+            await handlers.get(self.mode, no_pattern)()
 
-            await asyncio.sleep(0)  # Yield control to the event loop
+    async def _wait_mode_change(self):
+        """
+        Sleep until set_mode() is called, used by the modes that never change the LED.
+        """
+        self._mode_changed.clear()
+        await self._mode_changed.wait()
 
     def set_mode(self, mode: str):
         """
@@ -61,5 +84,8 @@ class LEDController:
         Args:
             mode: One of the supported mode strings (e.g., "not_connected", "connected", etc.)
         """
+        if mode == self.mode:
+            return  # Already showing this mode, e.g. during reconnect storms
         print(f"LED mode: {mode}")
-        self.mode = mode
\ No newline at end of file
+        self.mode = mode
+        self._mode_changed.set()  # Wake run() if it sleeps in a steady mode
\ No newline at end of file
@@ -1,4 +1,5 @@
 import machine
+import ubinascii
 import uasyncio as asyncio
 from wifi import WiFiAP, WiFiClient
 from motor import MotorController
@@ -38,7 +39,7 @@ async def main():
 
     # Generate unique identifiers based on hardware MAC
     mac = machine.unique_id()
-    mac_suffix = ''.join(['{:02x}'.format(b) for b in mac[-2:]])
+    mac_suffix = ubinascii.hexlify(mac[-2:]).decode()
     ssid = f"{AP_SSID}-{mac_suffix}"
     hostname = f"esp32-{mac_suffix}"
 
@@ -1,8 +1,36 @@
 from machine import Pin
 import uasyncio as asyncio
 import time
+import micropython
+from array import array
+from micropython import const
 from typing import List, Tuple, Dict
 
+# ESP32 GPIO output set/clear registers, writing a mask changes only the pins whose bits are set
+_GPIO_OUT_W1TS = const(0x3FF44008)
+_GPIO_OUT_W1TC = const(0x3FF4400C)
+# Diagnostic prints cost milliseconds each over the UART; with 0 the compiler drops them
+_DEBUG = const(0)
+
+
+@micropython.viper
+def _pulse(mask: int, high_us: int):
+    """
+    Emit one STEP pulse: set the pin, hold it for high_us microseconds, clear it.
+    Compiled to native code, so the pulse width is not stretched by the interpreter.
+    The hold blocks the event loop, so keep high_us to the few microseconds the driver needs.
+
+    Args:
+        mask: The STEP pin bit in the GPIO output registers.
+        high_us: Pulse width in microseconds.
+    """
+    gpio_set = ptr32(_GPIO_OUT_W1TS)
+    gpio_clr = ptr32(_GPIO_OUT_W1TC)
+    gpio_set[0] = mask
+    time.sleep_us(high_us)
+    gpio_clr[0] = mask
+
+
 class MotorController:
     """
     A controller for managing stepper motors that simulate elevator movement between floors.
@@ -15,18 +43,17 @@ class MotorController:
         Args:
             motor_pins: A list of tuples, each containing (step_pin, dir_pin, enable_pin) for one motor.
         """
-        self.motors: List[Dict[str, Pin]] = []
+        # One list per pin role, indexed by motor
+        self.step_pins: List[Pin] = [Pin(step_pin, Pin.OUT) for step_pin, _, _ in motor_pins]
+        self.dir_pins: List[Pin] = [Pin(dir_pin, Pin.OUT) for _, dir_pin, _ in motor_pins]
+        self.enable_pins: List[Pin] = [Pin(enable_pin, Pin.OUT) for _, _, enable_pin in motor_pins]
 
-        for step_pin, dir_pin, enable_pin in motor_pins:
-            self.motors.append({
-                "step": Pin(step_pin, Pin.OUT),
-                "dir": Pin(dir_pin, Pin.OUT),
-                "enable": Pin(enable_pin, Pin.OUT)
-            })
+        # Bit of each STEP pin in the GPIO output registers (0 = pin 32+, driven through the Pin object)
+        self.step_masks: List[int] = [1 << step_pin if step_pin < 32 else 0 for step_pin, _, _ in motor_pins]
 
         # Disable all motors initially
-        for motor in self.motors:
-            motor["enable"].off()
+        for enable in self.enable_pins:
+            enable.on()  # EN is active-low
 
         self.moving_status: List[bool] = [False] * len(motor_pins)  # Track movement status of each motor
         self.stop_request: List[bool] = [False] * len(motor_pins)   # Track stop requests
@@ -36,18 +63,33 @@ class MotorController:
         # Constants
         self.STEPS_PER_FLOOR: int = 550        # Number of steps for floor
         self.MIN_STEP_DELAY_US: int = 500      # Fastest delay (max speed)
+        self.STEP_PULSE_US: int = 5            # STEP high time (A4988 needs >= 1 us, DRV8825 >= 1.9 us)
         self.ACCELERATION_STEPS: int = 50      # Number of steps for acceleration/deceleration
         self.MAX_STEP_DELAY_US: int = 2000     # Slowest delay (start/end speed)
+        self.DEDGE: bool = False               # Driver steps on both STEP edges (A4988/DRV8825 do not)
+
+        # Acceleration ramp: entry i is the delay after step i of a move. Deceleration is the
+        # mirror image, so the last steps of a move read the same table from the other end.
+        self.ramp_delays = array('H', [
+            int(self.MAX_STEP_DELAY_US - (self.MAX_STEP_DELAY_US - self.MIN_STEP_DELAY_US) * i / self.ACCELERATION_STEPS)
+            for i in range(self.ACCELERATION_STEPS)
+        ])
+
+        # (from floor, to floor) -> (steps, direction) for every move between floors 1..3
+        self._move_table: Dict[Tuple[int, int], Tuple[int, int]] = {
+            (f, t): (abs(t - f) * self.STEPS_PER_FLOOR, 0 if t > f else 1)
+            for f in (1, 2, 3) for t in (1, 2, 3)
+        }
 
-    async def enable_motor(self, motor_index: int, enable: bool = True):
+    def enable_motor(self, motor_index: int, enable: bool = True):
         """
-        Enable or disable a specific motor.
+        Enable or disable a specific motor (the driver's EN input is active-low).
 
         Args:
             motor_index: Index of the motor.
             enable: True to enable, False to disable.
         """
-        self.motors[motor_index]["enable"].value(not enable)
+        self.enable_pins[motor_index].value(0 if enable else 1)
 
     async def step_motor(self, motor_index: int, direction: int):
         """
@@ -57,27 +99,35 @@ class MotorController:
             motor_index: Index of the motor.
             direction: 0 or 1 indicating movement direction.
         """
-        motor = self.motors[motor_index]
-        motor["dir"].value(direction)
-        motor["step"].on()
-        await self.delay_us(self.MIN_STEP_DELAY_US)
-        motor["step"].off()
+        step = self.step_pins[motor_index]
+        mask = self.step_masks[motor_index]
+        self.dir_pins[motor_index].value(direction)
+        if mask:
+            _pulse(mask, self.STEP_PULSE_US)  # Whole STEP pulse in native code
+        else:
+            step.on()
+            time.sleep_us(self.STEP_PULSE_US)
+            step.off()
 
     async def delay_us(self, us: int):
         """
-        Delay for a specified number of microseconds.
+        Wait for the given number of microseconds.
+
+        The whole milliseconds are awaited, so other tasks run meanwhile; a delay under
+        1 ms still yields once. uasyncio only times whole milliseconds, so the rest is
+        busy-waited, measured from the start so that a late wake-up shortens it. That
+        blocks the event loop for under 1 ms per call and keeps the acceleration ramp exact.
 
         Args:
             us: Number of microseconds to wait.
         """
         if us <= 0:
             return
-        elif us >= 1000:
-            await asyncio.sleep_ms(us // 1000)
-        else:
-            start = time.ticks_us()
-            while time.ticks_diff(time.ticks_us(), start) < us:
-                await asyncio.sleep_ms(0)  # Yield control to the event loop
+        start = time.ticks_us()
+        await asyncio.sleep_ms(us // 1000)  # 0 for sub-millisecond delays, just a yield
+        remaining = us - time.ticks_diff(time.ticks_us(), start)
+        if remaining > 0:
+            time.sleep_us(remaining)  # Sub-millisecond remainder the scheduler cannot time
 
     async def rotate_motor(self, motor_index: int, steps: int, direction: int):
         """
@@ -88,56 +138,61 @@ class MotorController:
             steps: Number of steps to take.
             direction: Direction to move the motor (0 or 1).
         """
-        if motor_index >= len(self.motors):
+        if motor_index >= len(self.step_pins):
             raise ValueError("Invalid motor index")
         if steps == 0:
             return
 
         self.moving_status[motor_index] = True
-        await self.enable_motor(motor_index, True)
+        self.enable_motor(motor_index, True)
 
         try:
-            self.motors[motor_index]["dir"].value(direction)
-
-            def calculate_delay(step: int) -> int:
-                """
-                Calculate dynamic delay for acceleration and deceleration.
-
-                Args:
-                    step: Current step index.
-
-                Returns:
-                    Delay in microseconds.
-                """
-                if step < self.ACCELERATION_STEPS:
-                    # Accelerate
-                    delay = self.MAX_STEP_DELAY_US - (
-                        (self.MAX_STEP_DELAY_US - self.MIN_STEP_DELAY_US) * step / self.ACCELERATION_STEPS
-                    )
-                elif step > steps - self.ACCELERATION_STEPS:
-                    # Decelerate
-                    delay = self.MIN_STEP_DELAY_US + (
-                        (self.MAX_STEP_DELAY_US - self.MIN_STEP_DELAY_US) * (step - (steps - self.ACCELERATION_STEPS)) / self.ACCELERATION_STEPS
-                    )
-                else:
-                    # Constant speed
-                    delay = self.MIN_STEP_DELAY_US
-                return int(delay)
+            self.dir_pins[motor_index].value(direction)
+
+            step = self.step_pins[motor_index]
+            mask = self.step_masks[motor_index]
+            ramp = self.ramp_delays
+            accel_steps = self.ACCELERATION_STEPS
+            decel_start = steps - accel_steps  # Deceleration covers the steps after this one
+            min_delay = self.MIN_STEP_DELAY_US
+            pulse_us = self.STEP_PULSE_US
+            dedge = self.DEDGE
+            # Both modes step once per MIN_STEP_DELAY_US plus the ramp delay. A STEP pulse already
+            # spends pulse_us of that period; a DEDGE step is a single edge and spends none
+            low_extra = min_delay if dedge else min_delay - pulse_us
+            level = step.value()  # Current STEP level, toggled once per step in DEDGE mode
+            # Bound methods looked up once, the loop below only calls them
+            step_value = step.value
+            step_on = step.on
+            step_off = step.off
+            delay_us = self.delay_us
+            stop_request = self.stop_request
 
             for current_step in range(steps):
-                if self.stop_request[motor_index]:
+                if stop_request[motor_index]:
                     break  # Stop request received, exit loop early
 
-                self.motors[motor_index]["step"].on()
-                await self.delay_us(self.MIN_STEP_DELAY_US)
-                self.motors[motor_index]["step"].off()
-
-                delay = calculate_delay(current_step)
-                await self.delay_us(delay)
+                if dedge:
+                    level ^= 1
+                    step_value(level)  # Every edge is a step, no separate pulse width to wait
+                elif mask:
+                    _pulse(mask, pulse_us)  # Whole STEP pulse in native code
+                else:
+                    step_on()
+                    time.sleep_us(pulse_us)
+                    step_off()
+
+                if current_step < accel_steps:
+                    delay = ramp[current_step]  # Accelerate
+                elif current_step > decel_start:
+                    delay = ramp[steps - current_step]  # Decelerate
+                else:
+                    delay = min_delay  # Constant speed
+                await delay_us(delay + low_extra)
 
         finally:
             self.moving_status[motor_index] = False
-            await self.enable_motor(motor_index, True)
+            self.enable_motor(motor_index, False)  # Release the coils once the move ends
 
     def is_moving(self, motor_index: int) -> bool:
         """
@@ -171,20 +226,20 @@ class MotorController:
             motor_index: Index of the motor.
             target_floor: Target floor number.
         """
-        print(f"[MOTOR DEBUG] Starting move: motor={motor_index}, from={self.current_floor[motor_index]}, to={target_floor}")
+        if _DEBUG:
+            print(f"[MOTOR DEBUG] Starting move: motor={motor_index}, from={self.current_floor[motor_index]}, to={target_floor}")
         
-        if motor_index >= len(self.motors):
+        if motor_index >= len(self.step_pins):
             raise ValueError(f"Invalid motor index: {motor_index}")
-        if target_floor < 1 or target_floor > 3:
+        move = self._move_table.get((self.current_floor[motor_index], target_floor))
+        if move is None:
             raise ValueError(f"Invalid floor number: {target_floor}")
-        if self.current_floor[motor_index] == target_floor:
-            print(f"[MOTOR DEBUG] Motor {motor_index} already on floor {target_floor}")
+        steps, direction = move
+        if steps == 0:
+            if _DEBUG:
+                print(f"[MOTOR DEBUG] Motor {motor_index} already on floor {target_floor}")
             return
 
-        floor_diff = target_floor - self.current_floor[motor_index]
-        steps = abs(floor_diff) * self.STEPS_PER_FLOOR
-        direction = 0 if floor_diff > 0 else 1
-
         await self.rotate_motor(motor_index, steps, direction)
         self.current_floor[motor_index] = target_floor
 
@@ -192,6 +247,6 @@ class MotorController:
         """
         Move all motors to floor 1 (reset position).
         """
-        for i in range(len(self.motors)):
+        for i in range(len(self.step_pins)):
             if self.current_floor[i] != 1:
                 await self.move_to_floor(i, 1)
\ No newline at end of file
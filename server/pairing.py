@@ -2,6 +2,32 @@ import socket
 import uasyncio as asyncio
 import json
 import network
+import ubinascii
+import time
+import micropython
+
+# How long a pairing attempt listens for the client's 'paired' confirmation,
+# covering all hello retransmissions plus a short grace period after the last one
+CONFIRM_TIMEOUT_MS = 2000
+# Station MAC address, read once at import and shared by every Pairing instance
+_STA_MAC = network.WLAN(network.STA_IF).config('mac')
+# Pairing messages start with their "type" field, so it is searched for in this many leading bytes
+TYPE_SCAN_BYTES = 64
+
+def _wait_readable(sock):
+    """
+    Park the awaiting task in the asyncio poller until sock becomes readable.
+
+    The public StreamReader cannot be used here: it only offers read(), and the
+    hello reply needs the sender address that recvfrom() returns. This is the only
+    place that touches the private uasyncio I/O queue. It does what
+    StreamReader.read() does internally and was checked against MicroPython v1.24
+    (asyncio/core.py, IOQueue.queue_read). Recheck it after a firmware update.
+
+    Args:
+        sock (socket): Non-blocking socket to wait on.
+    """
+    yield asyncio.core._io_queue.queue_read(sock)
 
 class Pairing:
     def __init__(self, hostname, ip, led):
@@ -18,6 +44,14 @@ class Pairing:
         self.led = led                        # LED controller for visual feedback
         self.sock = None                      # UDP socket (will be initialized in start())
         self.paired = False                   # Indicates whether pairing has completed
+        self.mac = self._format_mac(_STA_MAC)  # Hex form of the station MAC address
+        # The 'hello' response is identical for every request and retransmission, encode it once
+        self._hello_payload = json.dumps({
+            "ip": self.ip,
+            "type": "hello",
+            "hostname": self.hostname,
+            "mac": self.mac
+        }).encode()
 
     async def start(self):
         """
@@ -30,6 +64,9 @@ class Pairing:
         # Enable broadcast option so the device can receive broadcast packets
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
+        # Allow rebinding port 5000 when pairing is started again before the old socket is gone
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
         # Make socket non-blocking to allow asynchronous I/O
         self.sock.setblocking(False)
 
@@ -44,52 +81,53 @@ class Pairing:
         # Start listening for incoming pairing requests asynchronously
         asyncio.create_task(self._listen_for_pairing())
 
+    @micropython.native  # Runs for every datagram while pairing
     async def _listen_for_pairing(self):
         """
         Listen for incoming UDP messages that indicate a pairing request.
         If a valid message is received, respond and try to complete the pairing process.
         """
-        while not self.paired:
-            try:
-                # Wait for a UDP message with a short timeout
-                data, addr = await asyncio.wait_for(
-                    self._recvfrom_nonblocking(),
-                    timeout=0.1
-                )
-                # Decode and parse the received JSON message
-                message = json.loads(data.decode())
-
-                # Check if the message is a pairing request
-                if message.get("type") == "pairing":
-                    print(f"Received pairing request from {addr}")
-                    await self._respond_to_pairing(message, addr)
-
-            except asyncio.TimeoutError:
-                # No data received within timeout period — this is normal
-                pass
-            except Exception as e:
-                # Some unexpected error occurred while receiving
-                print(f"Error receiving message: {e}")
-                self.led.set_mode("not_connected")
-
-            await asyncio.sleep(0)  # Yield control to the event loop
-
-    async def _recvfrom_nonblocking(self):
+        try:
+            while not self.paired:
+                try:
+                    # Sleep until a UDP message arrives
+                    data, addr = await self._recvfrom_nonblocking()
+                    # Drop unrelated broadcasts cheaply, before decoding or parsing them
+                    if not data or data[0] != 0x7B or b'"pairing"' not in data[:TYPE_SCAN_BYTES]:
+                        continue
+                    # Decode and parse the received JSON message
+                    message = json.loads(data)  # Parsed straight from the datagram bytes
+
+                    # Check if the message is a pairing request
+                    if message.get("type") == "pairing":
+                        print(f"Received pairing request from {addr}")
+                        await self._respond_to_pairing(message, addr)
+
+                except Exception as e:
+                    # Some unexpected error occurred while receiving
+                    print(f"Error receiving message: {e}")
+                    self.led.set_mode("not_connected")
+                    await asyncio.sleep_ms(50)  # Back off so a persistent error does not hot-loop
+        finally:
+            self.close()  # Paired (or cancelled): free the socket and its lwIP buffers right away
+
+    def _recvfrom_nonblocking(self):
         """
         Non-blocking version of socket.recvfrom() to be used with asyncio.
-        
+        When no datagram is queued, the task is parked in the asyncio poller
+        and woken only once the socket becomes readable. It is a generator,
+        like the uasyncio stream methods, so it can be awaited and yield to the poller.
+
         Returns:
             tuple: Received data and sender address.
         """
         while True:
             try:
-                data, addr = self.sock.recvfrom(1024)  # Try receiving data
-                return data, addr
+                return self.sock.recvfrom(1024)  # Try receiving data
             except OSError as e:
-                if e.errno == 11:  # EAGAIN: no data available right now
-                    await asyncio.sleep(0)
-                else:
+                if e.errno != 11:  # EAGAIN: no data available right now
                     raise  # Other error — re-raise
+            yield from _wait_readable(self.sock)  # Wait for the next datagram
 
     async def _respond_to_pairing(self, message, addr):
         """
@@ -104,26 +142,35 @@ class Pairing:
         client_hostname = message["hostname"]
         client_mac = message["mac"]
 
-        # Build a response message with device details
-        response = {
-            "ip": self.ip,
-            "type": "hello",
-            "hostname": self.hostname,
-            "mac": self._format_mac(network.WLAN(network.STA_IF).config('mac'))
-        }
-
-        # Send the response multiple times to improve reliability
-        for _ in range(5):
-            self.sock.sendto(json.dumps(response).encode(), addr)
-            print(f"Sent hello response to {addr}")
-            await asyncio.sleep(1)  # Delay between responses
-
-        # Wait for confirmation from client that pairing was successful
-        if await self._wait_for_paired_confirmation(client_ip):
+        # Retransmit the hello in the background while listening for the confirmation,
+        # so a client that confirms after the first hello does not wait for the other four
+        send_task = asyncio.create_task(self._send_hello(addr))
+        try:
+            # Wait for confirmation from client that pairing was successful
+            paired = await self._wait_for_paired_confirmation(client_ip)
+        finally:
+            send_task.cancel()  # Stop retransmitting once confirmed (or given up)
+        if paired:
             print("Pairing successful")
         else:
             print("Pairing failed")
 
+    async def _send_hello(self, addr):
+        """
+        Send the precomputed 'hello' response multiple times to improve reliability.
+        The gap starts at 20 ms and doubles after every send up to 500 ms, so a lost
+        packet is repeated quickly while all six sends still span about one second.
+
+        Args:
+            addr (tuple): Client's (IP, port) tuple.
+        """
+        delay_ms = 20
+        for _ in range(6):
+            self.sock.sendto(self._hello_payload, addr)
+            print(f"Sent hello response to {addr}")
+            await asyncio.sleep_ms(delay_ms)  # Delay between responses
+            delay_ms = min(delay_ms * 2, 500)
+
     async def _wait_for_paired_confirmation(self, client_ip):
         """
         Wait for a 'paired' message from the client confirming the pairing.
@@ -134,14 +181,20 @@ class Pairing:
         Returns:
             bool: True if pairing confirmation received, False otherwise.
         """
-        for _ in range(5):  # Try multiple times in case of packet loss
+        deadline = time.ticks_add(time.ticks_ms(), CONFIRM_TIMEOUT_MS)
+        while True:  # Keep receiving until the deadline, other packets may arrive first
+            remaining = time.ticks_diff(deadline, time.ticks_ms())
+            if remaining <= 0:
+                break
             try:
                 # Wait for incoming message
-                data, addr = await asyncio.wait_for(
+                data, addr = await asyncio.wait_for_ms(
                     self._recvfrom_nonblocking(),
-                    timeout=0.1
+                    remaining
                 )
-                message = json.loads(data.decode())
+                if not data or data[0] != 0x7B or b'"paired"' not in data[:TYPE_SCAN_BYTES]:
+                    continue  # Not a confirmation, skip the parse
+                message = json.loads(data)  # Parsed straight from the datagram bytes
 
                 # Check if this is the expected pairing confirmation
                 if message.get("type") == "paired" and message["ip"] == self.ip:
@@ -154,8 +207,7 @@ class Pairing:
                 pass
             except Exception as e:
                 print(f"Error waiting for paired confirmation: {e}")
-
-            await asyncio.sleep(0)  # Yield to the event loop
+                await asyncio.sleep_ms(50)  # Back off so a persistent error does not hot-loop
 
         # If we got here, pairing confirmation failed
         print("Failed to pair with client")
@@ -172,7 +224,7 @@ class Pairing:
         Returns:
             str: Formatted MAC address as a lowercase hex string.
         """
-        return ''.join("{:02x}".format(b) for b in mac_bytes)
+        return ubinascii.hexlify(mac_bytes).decode()
 
     def close(self):
         """
@@ -3,9 +3,54 @@ import uasyncio as asyncio
 import ubinascii
 import hashlib
 import json
+import struct
+import micropython
+from micropython import const
+from elevator import MAX_FLOOR
 
 WS_MAGIC_STRING = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
 WS_OPCODE_TEXT = 0x1  # Text frame opcode for WebSocket
+# Set to 1 to log every received message
+_DEBUG = const(0)
+ACCEPT_CACHE_SIZE = 8  # Handshake keys remembered for reconnecting clients
+RX_BUFFER_SIZE = 2048  # Frames up to this size are received without allocating
+MAX_HANDSHAKE_SIZE = 1024  # Upper bound on the client's HTTP upgrade request
+# 101 response, the only variable part is the accept key
+_HANDSHAKE_RESPONSE = (
+    "HTTP/1.1 101 Switching Protocols\r\n"
+    "Upgrade: websocket\r\n"
+    "Connection: Upgrade\r\n"
+    "Sec-WebSocket-Accept: %s\r\n\r\n"
+)
+
+# Fixed-shape responses, only the integer fields are filled in per message
+_CALL_PROC = b'{"response":{"type":"call","floor":%d,"elevator":%d,"status":"processing"}}'
+_CALL_DONE = b'{"response":{"type":"call","floor":%d,"elevator":%d,"status":"completed"}}'
+_TASK_PROC = b'{"response":{"type":"task","elevator":%d,"floor":%d,"status":"processing"}}'
+_TASK_DONE = b'{"response":{"type":"task","elevator":%d,"floor":%d,"status":"completed"}}'
+_RESET_PROC = b'{"response":{"type":"reset","elevator":6,"floor":1,"status":"processing"}}'
+_RESET_DONE = b'{"response":{"type":"reset","elevator":6,"floor":1,"status":"completed"}}'
+_INVALID_REQUEST = b'{"error":"Invalid request"}'
+
+
+@micropython.viper
+def _unmask(buf: ptr8, key: ptr8, n: int):
+    """
+    Remove the WebSocket masking from a payload in place.
+    Four bytes are XORed at a time with the key loaded as one 32-bit word,
+    the last 0-3 bytes one by one.
+
+    Args:
+        buf: The connection's word-aligned receive buffer, with the masked payload at offset 0.
+        key: The 4-byte masking key from the frame header.
+        n: Payload length in bytes.
+    """
+    k = key[0] | (key[1] << 8) | (key[2] << 16) | (key[3] << 24)  # Little-endian, like the words below
+    words = ptr32(buf)
+    for i in range(n >> 2):
+        words[i] = words[i] ^ k
+    for i in range(n - (n & 3), n):
+        buf[i] = buf[i] ^ key[i & 3]
 
 class WebSocketServer:
     def __init__(self, motors, led, wifi_ap, elevator):
@@ -24,6 +69,7 @@ class WebSocketServer:
         self.elevator = elevator
         self.tasks = {}  # Dictionary to store tasks by ID
         self.client_connected = False
+        self._accept_cache = {}  # Sec-WebSocket-Key -> complete encoded 101 response
 
     async def start(self, host: str = "0.0.0.0", port: int = 80):
         """
@@ -49,16 +95,21 @@ class WebSocketServer:
         self.client_connected = True
         self.led.set_mode("connected")
 
+        # Receive buffer of this connection, reused for all of its frames:
+        # RX_BUFFER_SIZE payload bytes followed by the 4-byte masking key
+        rxbuf = bytearray(RX_BUFFER_SIZE + 4)
+
         try:
             # Perform WebSocket handshake
             await self.handshake(reader, writer)
 
             # Continuously receive and process messages
             while True:
-                data = await self.receive_frame(reader)
+                data = await self.receive_frame(reader, rxbuf)
                 if not data:
                     break
-                print("Received:", data)
+                if _DEBUG:
+                    print("Received:", data)
                 await self.process_message(writer, data)
         except Exception as e:
             print("Client disconnected:", e)
@@ -78,67 +129,107 @@ class WebSocketServer:
             reader: StreamReader for reading client request.
             writer: StreamWriter for sending response.
         """
-        request_line = await reader.readline()
-        headers = {}
-        while True:
-            line = await reader.readline()
-            if line == b"\r\n" or line == b"":
-                break
-            key, value = line.decode().strip().split(": ", 1)
-            headers[key] = value
-
-        if "Sec-WebSocket-Key" not in headers:
+        # Read the whole request in a few bulk reads. The client waits for the 101
+        # response before sending frames, so no frame bytes are consumed here.
+        buf = b""
+        while b"\r\n\r\n" not in buf:
+            chunk = await reader.read(256)
+            if not chunk or len(buf) > MAX_HANDSHAKE_SIZE:
+                raise ValueError("Invalid WebSocket handshake")
+            buf += chunk
+
+        # Only the key header is needed, pick it out without splitting the other lines
+        i = buf.find(b"Sec-WebSocket-Key:")
+        if i < 0:
             raise ValueError("Invalid WebSocket handshake")
-
-        # Generate accept key for WebSocket handshake
-        key = headers["Sec-WebSocket-Key"]
-        accept_key = ubinascii.b2a_base64(
-            hashlib.sha1((key + WS_MAGIC_STRING).encode()).digest()
-        ).strip()
+        j = buf.find(b"\r\n", i)
+        key = buf[i + 18:j].strip().decode()
+
+        # Build the response for this key once, a client repeating its key gets the cached bytes
+        response = self._accept_cache.get(key)
+        if response is None:
+            accept_key = ubinascii.b2a_base64(
+                hashlib.sha1((key + WS_MAGIC_STRING).encode()).digest()
+            ).strip().decode()
+            response = (_HANDSHAKE_RESPONSE % accept_key).encode()
+            if len(self._accept_cache) >= ACCEPT_CACHE_SIZE:
+                self._accept_cache.pop(next(iter(self._accept_cache)))  # Make room, drop any entry
+            self._accept_cache[key] = response
 
         # Send handshake response
-        response = (
-            "HTTP/1.1 101 Switching Protocols\r\n"
-            "Upgrade: websocket\r\n"
-            "Connection: Upgrade\r\n"
-            f"Sec-WebSocket-Accept: {accept_key.decode()}\r\n\r\n"
-        )
-        writer.write(response.encode())
+        writer.write(response)
         await writer.drain()
 
-    async def receive_frame(self, reader) -> str | None:
+    async def _read_into(self, reader, buf) -> bool:
+        """
+        Fill buf completely from the stream, reading as many times as needed.
+
+        Args:
+            reader: StreamReader to read data from.
+            buf: memoryview slice to fill.
+
+        Returns:
+            True if buf was filled, False if the connection was closed first.
+        """
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            count = await reader.readinto(buf[pos:])
+            if not count:
+                return False
+            pos += count
+        return True
+
+    @micropython.native  # Byte-level framing work, compiled to machine code
+    async def receive_frame(self, reader, rxbuf: bytearray) -> str | None:
         """
         Receive and decode a WebSocket frame.
+        Header, masking key and payload are read into the connection's receive buffer;
+        only frames larger than RX_BUFFER_SIZE get a buffer of their own.
 
         Args:
             reader: StreamReader to read data from.
+            rxbuf: Receive buffer of this connection, RX_BUFFER_SIZE + 4 bytes long.
 
         Returns:
             Decoded message string or None if no data.
         """
-        header = await reader.read(2)
-        if not header:
+        mv = memoryview(rxbuf)
+        key = mv[RX_BUFFER_SIZE:]  # Masking key of the current frame
+        if not await self._read_into(reader, mv[:2]):
             return None
 
-        fin = (header[0] & 0x80) >> 7
-        opcode = header[0] & 0x0F
-        mask = (header[1] & 0x80) >> 7
-        length = header[1] & 0x7F
+        fin = (mv[0] & 0x80) >> 7
+        opcode = mv[0] & 0x0F
+        mask = (mv[1] & 0x80) >> 7
+        length = mv[1] & 0x7F
 
         if length == 126:
-            length = int.from_bytes(await reader.read(2), "big")
+            if not await self._read_into(reader, mv[:2]):
+                return None
+            length = struct.unpack_from(">H", rxbuf, 0)[0]
         elif length == 127:
-            length = int.from_bytes(await reader.read(8), "big")
+            if not await self._read_into(reader, mv[:8]):
+                return None
+            length = struct.unpack_from(">Q", rxbuf, 0)[0]
 
-        if mask:
-            masking_key = await reader.read(4)
+        if mask and not await self._read_into(reader, key):
+            return None
 
-        data = await reader.read(length)
+        # The payload starts at offset 0, so the word-wise unmask works on an aligned buffer
+        if length <= RX_BUFFER_SIZE:
+            data = rxbuf
+            view = mv[:length]
+        else:
+            data = bytearray(length)
+            view = memoryview(data)
+        if not await self._read_into(reader, view):
+            return None  # Connection closed mid-frame
         if mask:
-            data = bytes([data[i] ^ masking_key[i % 4] for i in range(len(data))])
+            _unmask(data, key, length)
 
         if opcode == WS_OPCODE_TEXT:
-            return data.decode()
+            return str(view, "utf-8")
         return None
 
     async def send_frame(self, writer, data: str):
@@ -149,24 +240,67 @@ class WebSocketServer:
             writer: StreamWriter to write data.
             data: String data to send.
         """
-        header = bytearray()
-        header.append(0x80 | WS_OPCODE_TEXT)
-        if len(data) < 126:
-            header.append(len(data))
-        elif len(data) < 65536:
-            header.append(126)
-            header.extend(len(data).to_bytes(2, "big"))
+        await self._emit_frame(writer, data.encode())
+
+    @micropython.native  # Byte-level framing work, compiled to machine code
+    async def _emit_frame(self, writer, db: bytes):
+        """
+        Send an already encoded WebSocket text frame of any size.
+
+        Args:
+            writer: StreamWriter to write data.
+            db: Encoded payload.
+        """
+        length = len(db)
+        # Header size: 2 bytes plus the extended payload length, if any
+        if length < 126:
+            header_len = 2
+        elif length < 65536:
+            header_len = 4
+        else:
+            header_len = 10
+
+        # Header and payload share one buffer, so the frame goes out in a single write
+        frame = bytearray(header_len + length)
+        frame[0] = 0x80 | WS_OPCODE_TEXT
+        if header_len == 2:
+            frame[1] = length
+        elif header_len == 4:
+            frame[1] = 126
+            frame[2:4] = length.to_bytes(2, "big")
         else:
-            header.append(127)
-            header.extend(len(data).to_bytes(8, "big"))
+            frame[1] = 127
+            frame[2:10] = length.to_bytes(8, "big")
+        frame[header_len:] = db
 
-        writer.write(header)
-        writer.write(data.encode())
+        writer.write(frame)
+        await writer.drain()
+
+    @micropython.native  # Byte-level framing work, compiled to machine code
+    async def _send_small_text(self, writer, payload: bytes):
+        """
+        Send a short, already encoded text frame (under 126 bytes) with a single write.
+        Used for the fixed-shape status responses; a longer payload goes through _emit_frame.
+
+        Args:
+            writer: StreamWriter to write data.
+            payload: Encoded JSON message, normally shorter than 126 bytes.
+        """
+        length = len(payload)
+        if length > 125:
+            await self._emit_frame(writer, payload)  # Needs an extended length field
+            return
+        frame = bytearray(2 + length)
+        frame[0] = 0x80 | WS_OPCODE_TEXT
+        frame[1] = length
+        frame[2:] = payload
+        writer.write(frame)
         await writer.drain()
 
     async def process_message(self, writer, message: str):
         """
         Process incoming JSON messages and dispatch to the correct handler.
+        A message is either a single command object or a JSON array of commands.
 
         Args:
             writer: StreamWriter to respond to client.
@@ -174,19 +308,38 @@ class WebSocketServer:
         """
         try:
             data = json.loads(message)
-            if "call" in data:
-                await self.handle_call(writer, data["call"])
-            elif "task" in data:
-                await self.handle_task(writer, data["task"])
-            elif "status" in data:
-                await self.handle_status(writer, data["status"])
-            elif "reset" in data:
-                await self.handle_reset(writer)
-            else:
-                await self.send_frame(writer, json.dumps({"error": "Invalid request"}))
         except Exception as e:
             print("Error processing message:", e)
             await self.send_frame(writer, json.dumps({"error": str(e)}))
+            return
+
+        # The client batches close-together commands into a JSON array
+        commands = data if isinstance(data, list) else (data,)
+        for command in commands:
+            try:
+                await self.dispatch_command(writer, command)
+            except Exception as e:
+                print("Error processing message:", e)
+                await self.send_frame(writer, json.dumps({"error": str(e)}))
+
+    async def dispatch_command(self, writer, data: dict):
+        """
+        Dispatch a single command to the correct handler.
+
+        Args:
+            writer: StreamWriter to respond to client.
+            data: Decoded command envelope (e.g. {"call": {...}}).
+        """
+        if "call" in data:
+            await self.handle_call(writer, data["call"])
+        elif "task" in data:
+            await self.handle_task(writer, data["task"])
+        elif "status" in data:
+            await self.handle_status(writer, data["status"])
+        elif "reset" in data:
+            await self.handle_reset(writer)
+        else:
+            await self._send_small_text(writer, _INVALID_REQUEST)
 
     async def handle_call(self, writer, call_data: dict):
         """
@@ -198,26 +351,20 @@ class WebSocketServer:
         """
         floor = int(call_data["floor"])
         elevator_id = int(call_data.get("elevator", 0))
+        # Same bounds as the elevator manager; also keeps the responses below 126 bytes
+        if not 1 <= floor <= MAX_FLOOR or elevator_id not in self.elevator.elevators:
+            await self._send_small_text(writer, _INVALID_REQUEST)
+            return
 
-        await self.send_frame(writer, json.dumps({
-            "response": {
-                "type": "call",
-                "floor": floor,
-                "elevator": elevator_id,
-                "status": "processing"
-            }
-        }))
+        await self._send_small_text(writer, _CALL_PROC % (floor, elevator_id))
 
         result = await self.elevator.call_elevator(floor, elevator_id)
+        if result is None:
+            # The elevator manager rejected the floor, end the call with an error instead
+            await self._send_small_text(writer, _INVALID_REQUEST)
+            return
 
-        await self.send_frame(writer, json.dumps({
-            "response": {
-                "type": "call",
-                "floor": floor,
-                "elevator": elevator_id,
-                "status": "completed"
-            }
-        }))
+        await self._send_small_text(writer, _CALL_DONE % (floor, elevator_id))
 
         # Assign floor task after call
         asyncio.create_task(
@@ -234,26 +381,16 @@ class WebSocketServer:
         """
         elevator_id = int(task_data.get("motor", 0))
         floor = int(task_data["floor"])
+        # Same bounds as the elevator manager; also keeps the responses below 126 bytes
+        if not 1 <= floor <= MAX_FLOOR or elevator_id not in self.elevator.elevators:
+            await self._send_small_text(writer, _INVALID_REQUEST)
+            return
 
-        await self.send_frame(writer, json.dumps({
-            "response": {
-                "type": "task",
-                "elevator": elevator_id,
-                "floor": floor,
-                "status": "processing"
-            }
-        }))
+        await self._send_small_text(writer, _TASK_PROC % (elevator_id, floor))
 
         await self.elevator.send_elevator(elevator_id, floor)
 
-        await self.send_frame(writer, json.dumps({
-            "response": {
-                "type": "task",
-                "elevator": elevator_id,
-                "floor": floor,
-                "status": "completed"
-            }
-        }))
+        await self._send_small_text(writer, _TASK_DONE % (elevator_id, floor))
 
     async def handle_status(self, writer, status_data: dict):
         """
@@ -268,15 +405,16 @@ class WebSocketServer:
             task = self.tasks[task_id]
             response = {
                 "response": {
-                    "task_id": task_id, 
-                    "motor": task["motor"], 
-                    "floor": task["floor"], 
-                    "action": task["action"], 
+                    "task_id": task_id,
+                    "motor": task["motor"],
+                    "floor": task["floor"],
+                    "action": task["action"],
                     "status": task["status"]
                 }
             }
         else:
             response = {"response": {"task_id": task_id, "status": "not_found"}}
+        # Rare path with client-supplied values, json.dumps takes care of quoting and escaping
         await self.send_frame(writer, json.dumps(response))
 
     async def handle_reset(self, writer):
@@ -286,22 +424,8 @@ class WebSocketServer:
         Args:
             writer: StreamWriter to respond.
         """
-        await self.send_frame(writer, json.dumps({
-            "response": {
-                "type": "reset",
-                "elevator": 6,
-                "floor": 1,
-                "status": "processing"
-            }
-        }))
+        await self._send_small_text(writer, _RESET_PROC)
 
         await self.elevator.reset_all()
 
-        await self.send_frame(writer, json.dumps({
-            "response": {
-                "type": "reset",
-                "elevator": 6,
-                "floor": 1,
-                "status": "completed"
-            }
-        }))
\ No newline at end of file
+        await self._send_small_text(writer, _RESET_DONE)
\ No newline at end of file
@@ -1,5 +1,8 @@
 import network
 import uasyncio as asyncio
+import time
+
+CONNECT_TIMEOUT_MS = 15000  # Give up on a station connection after this long
 
 class WiFiAP:
     def __init__(self, led):
@@ -24,9 +27,9 @@ class WiFiAP:
         self.ap.active(True)  # Enable access point
         self.ap.config(essid=ssid, password=password, authmode=3)  # WPA2-PSK
 
-        # Wait for AP to become active
+        # Wait for AP to become active (normally immediate, check often)
         while not self.ap.active():
-            await asyncio.sleep(1)
+            await asyncio.sleep_ms(50)
 
         self.led.set_mode("idle")  # Ready to accept connections
         print(f"Access point started: {ssid}")
@@ -66,19 +69,33 @@ class WiFiClient:
         Args:
             ssid (str): network name (e.g., "LexNET_2.4GHz").
             password (str): password to connect.
+
+        Returns:
+            bool: True if connected, False on timeout or a definite failure.
         """
         self.led.set_mode("not_connected")  # Indicate not connected
 
         self.sta.active(True)  # Activate station interface
         self.sta.connect(ssid, password)  # Attempt to connect
 
-        # Wait for connection (~10 seconds timeout)
+        # Wait for connection, polling often so success is noticed right away
+        start = time.ticks_ms()
         while not self.sta.isconnected():
-            await asyncio.sleep(1)
+            status = self.sta.status()
+            if status == network.STAT_WRONG_PASSWORD:
+                # The only definite failure; "no AP found" and "connect fail" also show up
+                # transiently while associating, so those are left to the timeout
+                print(f"Failed to connect to {ssid}, status {status}")
+                return False
+            if time.ticks_diff(time.ticks_ms(), start) > CONNECT_TIMEOUT_MS:
+                print(f"Timeout connecting to {ssid}")
+                return False
+            await asyncio.sleep_ms(50)
 
         self.connected = True
         self.led.set_mode("connected")  # Indicate successful connection
         print(f"Connected to network: {ssid}")
+        return True
 
     def is_connected(self):
         """Check current connection status.